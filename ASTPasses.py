@@ -0,0 +1,156 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import typing
+from ConstantFolding import TRUE, fold_binary, fold_unary
+from JackAST import (ArrayRef, Binary, Call, Class, Do, Expression, If,
+                     IntConst, KeywordConst, Let, Return, Statement, Unary,
+                     While)
+
+# The value of each foldable keyword constant.
+KEYWORD_VALUES = {'true': -1, 'false': 0, 'null': 0}
+
+
+def fold_expression(expression: Expression) -> Expression:
+    """Folds the constant sub-expressions of an expression.
+
+    Args:
+        expression (Expression): the expression to fold.
+
+    Returns:
+        Expression: an equivalent expression, an IntConst if it is constant.
+    """
+    if isinstance(expression, Binary):
+        expression.left = fold_expression(expression.left)
+        expression.right = fold_expression(expression.right)
+        if isinstance(expression.left, IntConst) and isinstance(expression.right, IntConst):
+            value = fold_binary(expression.op, expression.left.value, expression.right.value)
+            if value is not None:
+                return IntConst(value)
+    elif isinstance(expression, Unary):
+        expression.operand = fold_expression(expression.operand)
+        if isinstance(expression.operand, IntConst):
+            return IntConst(fold_unary(expression.op, expression.operand.value))
+    elif isinstance(expression, KeywordConst):
+        if expression.keyword in KEYWORD_VALUES:
+            return IntConst(KEYWORD_VALUES[expression.keyword])
+    elif isinstance(expression, ArrayRef):
+        expression.index = fold_expression(expression.index)
+    elif isinstance(expression, Call):
+        expression.arguments = [fold_expression(argument) for argument in expression.arguments]
+    return expression
+
+
+def fold_statements(statements: typing.List[Statement]) -> None:
+    """Folds the constant sub-expressions of every expression in a list of
+    statements, in place.
+    """
+    for statement in statements:
+        if isinstance(statement, Let):
+            if statement.index is not None:
+                statement.index = fold_expression(statement.index)
+            statement.value = fold_expression(statement.value)
+        elif isinstance(statement, If):
+            statement.condition = fold_expression(statement.condition)
+            fold_statements(statement.then_statements)
+            if statement.else_statements is not None:
+                fold_statements(statement.else_statements)
+        elif isinstance(statement, While):
+            statement.condition = fold_expression(statement.condition)
+            fold_statements(statement.statements)
+        elif isinstance(statement, Do):
+            statement.call = fold_expression(statement.call)
+        elif isinstance(statement, Return) and statement.value is not None:
+            statement.value = fold_expression(statement.value)
+
+
+def fold_constants(tree: Class) -> None:
+    """Replaces every constant sub-expression of the class by its value,
+    with the 16-bit semantics of ConstantFolding.
+    """
+    for subroutine in tree.subroutines:
+        fold_statements(subroutine.statements)
+
+
+def is_constant(condition: Expression, value: int) -> bool:
+    return isinstance(condition, IntConst) and condition.value == value
+
+
+def always_returns(statement: Statement) -> bool:
+    """
+    Returns:
+        bool: True if control never continues past the statement: it is a
+        return, a loop whose condition is the constant true, or an if whose
+        branches both always return.
+    """
+    if isinstance(statement, Return):
+        return True
+    if isinstance(statement, While):
+        return is_constant(statement.condition, TRUE)
+    if isinstance(statement, If):
+        return bool(statement.then_statements) and bool(statement.else_statements) and \
+            always_returns(statement.then_statements[-1]) and \
+            always_returns(statement.else_statements[-1])
+    return False
+
+
+def eliminate_dead_statements(statements: typing.List[Statement]) -> typing.List[Statement]:
+    """Removes the statements of a block that can never run. Conditions
+    must already be folded. The generated code takes the then-branch of an
+    if (and runs the body of a while) exactly when the condition is true,
+    i.e. -1, so any other constant selects the else-branch.
+
+    Returns:
+        typing.List[Statement]: the remaining statements.
+    """
+    remaining = []
+    for statement in statements:
+        if isinstance(statement, If):
+            statement.then_statements = eliminate_dead_statements(statement.then_statements)
+            if statement.else_statements is not None:
+                statement.else_statements = eliminate_dead_statements(statement.else_statements)
+            if isinstance(statement.condition, IntConst):
+                if statement.condition.value == TRUE:
+                    remaining.extend(statement.then_statements)
+                else:
+                    remaining.extend(statement.else_statements or [])
+                if remaining and always_returns(remaining[-1]):
+                    break
+                continue
+        elif isinstance(statement, While):
+            if isinstance(statement.condition, IntConst) and \
+                    statement.condition.value != TRUE:
+                continue
+            statement.statements = eliminate_dead_statements(statement.statements)
+        remaining.append(statement)
+        if always_returns(statement):
+            break
+    return remaining
+
+
+def eliminate_dead_code(tree: Class) -> None:
+    """Drops the branches of ifs with a constant condition, whiles whose
+    condition is constantly false, and statements after a return (or after
+    anything else that always returns).
+    """
+    for subroutine in tree.subroutines:
+        subroutine.statements = eliminate_dead_statements(subroutine.statements)
+
+
+def run_passes(tree: Class, optimizations: typing.Collection[str]) -> None:
+    """Runs the tree passes that the given optimizations ask for.
+
+    Args:
+        tree (Class): the class to rewrite, in place.
+        optimizations (typing.Collection[str]): the names of the enabled
+        CompilationEngine.OPTIMIZATIONS.
+    """
+    if "fold" in optimizations or "strength" in optimizations or \
+            "dce" in optimizations:
+        fold_constants(tree)
+    if "dce" in optimizations:
+        eliminate_dead_code(tree)
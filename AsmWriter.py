@@ -0,0 +1,383 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import typing
+
+# The pointer each segment relative to one is addressed through.
+POINTER_SEGMENTS = {"local": "LCL", "argument": "ARG", "this": "THIS", "that": "THAT"}
+TEMP_BASE = 5
+# The comp part of the Hack instruction each arithmetic command applies to
+# the top of the stack: binary ones with D holding the top and M the value
+# under it, unary ones with M holding the top.
+BINARY_COMPS = {"add": "M+D", "sub": "M-D", "and": "D&M", "or": "D|M"}
+UNARY_COMPS = {"neg": "-M", "not": "!M", "shiftleft": "M<<", "shiftright": "M>>"}
+COMPARISONS = ("eq", "gt", "lt")
+# How VMWriter writes "*" and "/".
+ARITHMETIC_CALLS = {"*": "Math.multiply", "/": "Math.divide"}
+# The largest index of a pointer segment that is reached by incrementing
+# the pointer instead of adding the index to it, which is shorter up to
+# there.
+PUSH_INCREMENT_LIMIT = 2
+POP_INCREMENT_LIMIT = 4
+# Functions with more locals than this clear them in a loop.
+UNROLLED_LOCALS = 8
+
+# The shared subroutines every call, return and comparison jumps to, so that
+# each one takes a few instructions of ROM instead of dozens. They are
+# entered with the return address in D. $CALL also expects the number of
+# arguments in R13 and the function in R14.
+CALL_SUBROUTINE = """($CALL)
+@SP
+AM=M+1
+A=A-1
+M=D
+@LCL
+D=M
+@SP
+AM=M+1
+A=A-1
+M=D
+@ARG
+D=M
+@SP
+AM=M+1
+A=A-1
+M=D
+@THIS
+D=M
+@SP
+AM=M+1
+A=A-1
+M=D
+@THAT
+D=M
+@SP
+AM=M+1
+A=A-1
+M=D
+@R13
+D=M
+@5
+D=D+A
+@SP
+D=M-D
+@ARG
+M=D
+@SP
+D=M
+@LCL
+M=D
+@R14
+A=M
+0;JMP
+"""
+RETURN_SUBROUTINE = """($RETURN)
+@LCL
+D=M
+@R13
+M=D
+@5
+A=D-A
+D=M
+@R14
+M=D
+@SP
+AM=M-1
+D=M
+@ARG
+A=M
+M=D
+@ARG
+D=M+1
+@SP
+M=D
+@R13
+AM=M-1
+D=M
+@THAT
+M=D
+@R13
+AM=M-1
+D=M
+@THIS
+M=D
+@R13
+AM=M-1
+D=M
+@ARG
+M=D
+@R13
+AM=M-1
+D=M
+@LCL
+M=D
+@R14
+A=M
+0;JMP
+"""
+EQ_SUBROUTINE = """($EQ)
+@R13
+M=D
+@SP
+AM=M-1
+D=M
+A=A-1
+D=M-D
+M=-1
+@$EQ$END
+D;JEQ
+@SP
+A=M-1
+M=0
+($EQ$END)
+@R13
+A=M
+0;JMP
+"""
+# Compares x, kept in R15, with y, the top of the stack, kept in R14: $GT
+# checks whether x > y and $LT whether y > x. Operands of different signs
+# are compared by their signs, since subtracting them may overflow.
+ORDER_SUBROUTINE = """(${name})
+@R13
+M=D
+@SP
+AM=M-1
+D=M
+@R14
+M=D
+@SP
+A=M-1
+D=M
+@R15
+M=D
+@{lesser}
+D=M
+@${name}$LESSER_NEGATIVE
+D;JLT
+@{greater}
+D=M
+@${name}$FALSE
+D;JLT
+@${name}$COMPARE
+0;JMP
+(${name}$LESSER_NEGATIVE)
+@{greater}
+D=M
+@${name}$TRUE
+D;JGE
+(${name}$COMPARE)
+@{lesser}
+D=M
+@{greater}
+D=M-D
+@${name}$TRUE
+D;JGT
+(${name}$FALSE)
+@SP
+A=M-1
+M=0
+@R13
+A=M
+0;JMP
+(${name}$TRUE)
+@SP
+A=M-1
+M=-1
+@R13
+A=M
+0;JMP
+"""
+
+
+class AsmWriter:
+    """Writes Hack assembly instead of VM code, and has the same interface as
+    VMWriter, so the compiler can translate straight to assembly without
+    writing VM code and parsing it again.
+
+    Each push and pop is written with a template for its segment, picked
+    with the index in hand: constants 0 and 1 and small indices of local,
+    argument, this and that get shorter sequences. Calls, returns and
+    comparisons jump to shared subroutines instead of being written out
+    every time; write_bootstrap writes those, once per program.
+
+    Labels are scoped to their function as "function$label" and static i of
+    a class is the variable "class.i", like the Hack VM translator does, so
+    the output of several classes can be concatenated after a bootstrap.
+    """
+
+    def __init__(self, output_stream: typing.TextIO, flush_threshold: int = 0) -> None:
+        """
+        Args:
+            output_stream (typing.TextIO): the stream to write to.
+            flush_threshold (int): if positive, the buffer is flushed whenever
+            it holds this many commands.
+        """
+        self.output_stream = output_stream
+        self.flush_threshold = flush_threshold
+        self.buffer = []
+        self.function = ""
+        self.class_name = ""
+        self.return_counter = 0
+
+    def write_lines(self, lines: str) -> None:
+        """Buffers the instructions of a single command.
+
+        Args:
+            lines (str): the instructions, each followed by a newline.
+        """
+        self.buffer.append(lines)
+        if self.flush_threshold and len(self.buffer) >= self.flush_threshold:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes all buffered instructions to the output stream."""
+        if self.buffer:
+            self.output_stream.write("".join(self.buffer))
+            self.buffer.clear()
+
+    def write_bootstrap(self, entry: str = "Sys.init") -> None:
+        """Writes the code a program starts with: it sets up the stack,
+        calls entry and then loops forever, followed by the shared
+        subroutines.
+
+        Args:
+            entry (str): the function to start at.
+        """
+        self.function = "$bootstrap"
+        self.write_lines("@256\nD=A\n@SP\nM=D\n")
+        self.write_call(entry, 0)
+        self.write_lines("($HALT)\n@$HALT\n0;JMP\n")
+        self.write_lines(CALL_SUBROUTINE + RETURN_SUBROUTINE + EQ_SUBROUTINE)
+        self.write_lines(ORDER_SUBROUTINE.format(name="GT", greater="R15", lesser="R14"))
+        self.write_lines(ORDER_SUBROUTINE.format(name="LT", greater="R14", lesser="R15"))
+
+    def address(self, segment: str, index: int) -> str:
+        """
+        Returns:
+            str: the symbol or address of a temp, pointer or static entry.
+        """
+        if segment == "temp":
+            return str(TEMP_BASE + index)
+        if segment == "pointer":
+            return "THAT" if index else "THIS"
+        if segment == "static":
+            return f"{self.class_name}.{index}"
+        raise ValueError(f"Invalid segment {segment}")
+
+    def write_push(self, segment: str, index: int) -> None:
+        segment = segment.lower()
+        if segment == "constant":
+            if index <= 1:
+                self.write_lines(f"@SP\nAM=M+1\nA=A-1\nM={index}\n")
+                return
+            load = f"@{index}\nD=A\n"
+        elif segment in POINTER_SEGMENTS:
+            pointer = POINTER_SEGMENTS[segment]
+            if index == 0:
+                load = f"@{pointer}\nA=M\nD=M\n"
+            elif index <= PUSH_INCREMENT_LIMIT:
+                load = f"@{pointer}\nA=M+1\n" + "A=A+1\n" * (index - 1) + "D=M\n"
+            else:
+                load = f"@{index}\nD=A\n@{pointer}\nA=D+M\nD=M\n"
+        else:
+            load = f"@{self.address(segment, index)}\nD=M\n"
+        self.write_lines(load + "@SP\nAM=M+1\nA=A-1\nM=D\n")
+
+    def write_pop(self, segment: str, index: int) -> None:
+        segment = segment.lower()
+        if segment in POINTER_SEGMENTS:
+            pointer = POINTER_SEGMENTS[segment]
+            if index == 0:
+                self.write_lines(f"@SP\nAM=M-1\nD=M\n@{pointer}\nA=M\nM=D\n")
+            elif index <= POP_INCREMENT_LIMIT:
+                self.write_lines(f"@SP\nAM=M-1\nD=M\n@{pointer}\nA=M+1\n" +
+                                 "A=A+1\n" * (index - 1) + "M=D\n")
+            else:
+                self.write_lines(f"@{index}\nD=A\n@{pointer}\nD=D+M\n@R13\nM=D\n"
+                                 "@SP\nAM=M-1\nD=M\n@R13\nA=M\nM=D\n")
+        else:
+            self.write_lines(f"@SP\nAM=M-1\nD=M\n@{self.address(segment, index)}\nM=D\n")
+
+    def write_arithmetic(self, command: str) -> None:
+        if command in ARITHMETIC_CALLS:
+            self.write_call(ARITHMETIC_CALLS[command], 2)
+            return
+        command = command.lower()
+        if command in BINARY_COMPS:
+            self.write_lines(f"@SP\nAM=M-1\nD=M\nA=A-1\nM={BINARY_COMPS[command]}\n")
+        elif command in UNARY_COMPS:
+            self.write_lines(f"@SP\nA=M-1\nM={UNARY_COMPS[command]}\n")
+        elif command in COMPARISONS:
+            self.write_subroutine_jump(f"${command.upper()}")
+        else:
+            raise ValueError(f"Invalid command {command}")
+
+    def write_subroutine_jump(self, subroutine: str, setup: str = "") -> None:
+        """Jumps to a shared subroutine, which returns right after the jump.
+
+        Args:
+            subroutine (str): the subroutine's label.
+            setup (str): instructions to run first, which must not need D.
+        """
+        return_label = f"{self.function}$ret.{self.return_counter}"
+        self.return_counter += 1
+        self.write_lines(f"{setup}@{return_label}\nD=A\n@{subroutine}\n0;JMP\n"
+                         f"({return_label})\n")
+
+    def write_label(self, label: str) -> None:
+        self.write_lines(f"({self.function}${label})\n")
+
+    def write_goto(self, label: str) -> None:
+        self.write_lines(f"@{self.function}${label}\n0;JMP\n")
+
+    def write_if(self, label: str) -> None:
+        self.write_lines(f"@SP\nAM=M-1\nD=M\n@{self.function}${label}\nD;JNE\n")
+
+    def write_call(self, name: str, n_args: int) -> None:
+        if n_args <= 1:
+            arguments = f"@R13\nM={n_args}\n"
+        else:
+            arguments = f"@{n_args}\nD=A\n@R13\nM=D\n"
+        self.write_subroutine_jump("$CALL", f"{arguments}@{name}\nD=A\n@R14\nM=D\n")
+
+    def write_function(self, name: str, n_locals: int) -> None:
+        self.function = name
+        self.class_name = name.split(".")[0]
+        lines = f"({name})\n"
+        if 0 < n_locals <= UNROLLED_LOCALS:
+            lines += "@SP\nA=M\nM=0\n" + "A=A+1\nM=0\n" * (n_locals - 1) + \
+                     "D=A+1\n@SP\nM=D\n"
+        elif n_locals > 0:
+            lines += f"@{n_locals}\nD=A\n({name}$$LOCALS)\n@SP\nAM=M+1\nA=A-1\nM=0\n" \
+                     f"D=D-1\n@{name}$$LOCALS\nD;JGT\n"
+        self.write_lines(lines)
+
+    def write_return(self) -> None:
+        self.write_lines("@$RETURN\n0;JMP\n")
+
+
+def translate(commands: typing.Iterable[typing.Tuple], writer) -> None:
+    """Writes already compiled VM code through a writer, e.g. to translate
+    the .vm files of the OS to assembly along with a program.
+
+    Args:
+        commands (typing.Iterable[typing.Tuple]): the words of every
+        command, see VMInterpreter.read_program.
+        writer: an AsmWriter, or anything with the same interface.
+    """
+    for command in commands:
+        op = command[0]
+        if op in ("push", "pop", "call", "function"):
+            getattr(writer, "write_" + op)(command[1], int(command[2]))
+        elif op == "label" or op == "goto":
+            getattr(writer, "write_" + op)(command[1])
+        elif op == "if-goto":
+            writer.write_if(command[1])
+        elif op == "return":
+            writer.write_return()
+        else:
+            writer.write_arithmetic(op)
@@ -0,0 +1,410 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import argparse
+import io
+import json
+import sys
+import tempfile
+import time
+import typing
+from CompilationEngine import CompilationEngine
+from JackCompiler import compile_file
+from JackParser import JackParser
+from JackTokenizer import JackTokenizer
+from SymbolTable import SymbolTable
+
+LEGACY_KEYWORDS = ['class', 'constructor', 'function', 'method', 'field', 'static', 'var', 'int', 'char', 'boolean',
+                   'void', 'true', 'false', 'null', 'this', 'let', 'do', 'if', 'else', 'while', 'return']
+LEGACY_SYMBOLS = ['{', '}', '(', ')', '[', ']', '.', ',', ';', '+', '-', '*', '/', '&', '|', '<', '>', '=', '~', '^',
+                  '#']
+
+BODY_LINES = [
+    "let x = x + (y * 3) - Main.double(a[i], b);  // running total",
+    "if (~(x < 10) & (y > 2)) { let y = y - 1; }",
+    "while (i < length) { let a[i] = i; let i = i + 1; }",
+    "/* block comment */ do Output.printString(\"Hello world\");",
+    "let done = true; let mask = ^mask | #x;",
+]
+# Sources every lexing mode must handle the same way: each either fails
+# with the same error in all of them or gives the same tokens.
+LEXER_CASES = [
+    "let x = 1; /* never closed\nlet y = 2;\n",
+    'let s = "unterminated;\nlet t = 1;\n',
+    "let x = 1;\n/\n*/ let y = x / 2; // ok\n",
+    "let x = 1 $ 2;\n",
+    "let caf\u00e9 = \u00fcber + 1;\n",
+    'do Output.printString("\u00fcber / * // ");\n',
+    "/** only a comment */\n",
+    "",
+]
+
+
+def legacy_token_split(text: str) -> typing.List[str]:
+    """The tokenizer as it was before the single-pass lexer, kept only as a
+    reference point for the benchmark.
+    """
+    tokens = []
+    input_lines = JackTokenizer.comment_remover(None, text).splitlines()
+    for i in range(len(input_lines)):
+        line = input_lines[i].replace("\t", " ").replace("  ", " ").split("//")[0]
+        input_lines[i] = " ".join(line.split())
+    for line in input_lines:
+        line_cpy = line
+        while len(line_cpy) > 0:
+            not_string = True
+            token = ''
+            for saved_word in LEGACY_KEYWORDS:
+                if line_cpy.startswith(saved_word + " ") or line_cpy.startswith(saved_word + ";"):
+                    token = saved_word
+                    break
+            for saved_word in LEGACY_SYMBOLS:
+                if line_cpy.startswith(saved_word):
+                    token = saved_word
+                    break
+            if token == '':
+                if line_cpy.startswith('"'):
+                    token = '"' + line_cpy[1:].split('"')[0] + '"'
+                    not_string = False
+                else:
+                    token = line_cpy
+                    for saved_word in LEGACY_KEYWORDS:
+                        if (" " + saved_word + " ") in line_cpy or (" " + saved_word + ";") in line_cpy:
+                            temp_token = line_cpy.split(saved_word)[0]
+                            if len(token) >= len(temp_token):
+                                token = temp_token
+                    for saved_word in LEGACY_SYMBOLS:
+                        if saved_word in line_cpy:
+                            temp_token = line_cpy.split(saved_word)[0]
+                            if len(token) >= len(temp_token):
+                                token = temp_token
+            if ' ' in token and not_string:
+                token = token.split(' ')[0]
+                line_cpy = line_cpy.replace(' ', '', 1)
+            if token != '':
+                tokens.append(token)
+            line_cpy = line_cpy.replace(token, '', 1)
+            while len(line_cpy) > 0 and line_cpy.startswith(" "):
+                line_cpy = line_cpy[1:]
+    return tokens
+
+
+def generate_source(line_count: int) -> str:
+    """Generates a Jack class of about line_count lines, which declares
+    everything BODY_LINES uses, so it compiles as well as it lexes.
+    """
+    lines = ["class Main {", "    function int double(int v, int w) {", "        return v + v + w;",
+             "    }", "    function void main() {", "        var int x, y, i, b, length, mask;",
+             "        var boolean done;", "        var Array a;"]
+    for i in range(line_count - 10):
+        lines.append("        " + BODY_LINES[i % len(BODY_LINES)])
+    lines += ["        return;", "    }", "}"]
+    return "\n".join(lines) + "\n"
+
+
+# How deeply generate_expressions nests each expression. The compiler
+# recurses a few frames per level, so this stays well below the recursion
+# limit.
+EXPRESSION_DEPTH = 40
+# The length of every literal generate_strings writes.
+STRING_LENGTH = 500
+
+
+def generate_expressions(size: int) -> str:
+    """Generates a class with size statements, each assigning an expression
+    nested EXPRESSION_DEPTH levels deep through parentheses, unary operators,
+    array accesses and calls.
+    """
+    forms = ["({} + {})", "-({} * y)", "a[{} - {}]", "Main.twice({})", "~({} | {})"]
+    lines = ["class Main {", "    function int twice(int v) {", "        return v + v;",
+             "    }", "    function void main() {", "        var int x, y;",
+             "        var Array a;", "        let a = Array.new(100);"]
+    for i in range(size):
+        expression = "x"
+        for depth in range(EXPRESSION_DEPTH):
+            expression = forms[(i + depth) % len(forms)].format(expression, depth)
+        lines.append(f"        let x = {expression};")
+    lines += ["        return;", "    }", "}"]
+    return "\n".join(lines) + "\n"
+
+
+def generate_strings(size: int) -> str:
+    """Generates a class that prints size distinct literals of STRING_LENGTH
+    characters.
+    """
+    lines = ["class Main {", "    function void main() {"]
+    for i in range(size):
+        text = (f"{i} Lorem ipsum dolor sit amet " * STRING_LENGTH)[:STRING_LENGTH]
+        lines.append(f'        do Output.printString("{text}");')
+    lines += ["        return;", "    }", "}"]
+    return "\n".join(lines) + "\n"
+
+
+def generate_fields(size: int) -> str:
+    """Generates a class with size fields, and a method with size locals
+    that reads every field and local.
+    """
+    names = [f"f{i}" for i in range(size)]
+    local_names = [f"l{i}" for i in range(size)]
+    lines = ["class Main {"]
+    lines += [f"    field int {', '.join(names[i:i + 10])};" for i in range(0, size, 10)]
+    lines += ["    constructor Main new() {"]
+    lines += [f"        let f{i} = {i};" for i in range(size)]
+    lines += ["        return this;", "    }", "    method int sum() {"]
+    lines += [f"        var int {', '.join(local_names[i:i + 10])};" for i in range(0, size, 10)]
+    lines += ["        let l0 = f0;"]
+    lines += [f"        let l{i} = f{i} + l{i - 1};" for i in range(1, size)]
+    lines += [f"        return l{size - 1};", "    }", "}"]
+    return "\n".join(lines) + "\n"
+
+
+def generate_branches(size: int) -> str:
+    """Generates a class with a chain of size if statements, each with an
+    else branch holding a while loop.
+    """
+    lines = ["class Main {", "    function void main() {", "        var int x, y;"]
+    for i in range(size):
+        lines += [f"        if (x = {i}) {{", f"            let y = y + {i};",
+                  "        } else {", f"            while (y > {i}) {{",
+                  "                let y = y - 1;", "            }", "        }"]
+    lines += ["        return;", "    }", "}"]
+    return "\n".join(lines) + "\n"
+
+
+SCENARIOS = {
+    "expressions": generate_expressions,
+    "strings": generate_strings,
+    "fields": generate_fields,
+    "branches": generate_branches,
+}
+
+
+def best_time(function: typing.Callable[..., typing.Any], repeat: int,
+              setup: typing.Callable[[], typing.Tuple] = tuple) -> float:
+    """Returns the best wall time of repeat calls to function, in seconds.
+
+    Args:
+        function (typing.Callable[..., typing.Any]): the code to time.
+        repeat (int): how many times to call it.
+        setup (typing.Callable[[], typing.Tuple]): called before every call,
+        without being timed, to build the arguments function is called with.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        args = setup()
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def replay_symbols(tree) -> None:
+    """Defines every variable of a parsed class in a SymbolTable and looks
+    each one up, the way CompilationEngine uses the table.
+    """
+    table = SymbolTable()
+    for var_dec in tree.var_decs:
+        kind = "this" if var_dec.kind == "field" else var_dec.kind
+        for name in var_dec.names:
+            table.define(name, var_dec.type, kind)
+            table.var_count(kind)
+    class_names = [name for var_dec in tree.var_decs for name in var_dec.names]
+    for subroutine in tree.subroutines:
+        table.start_subroutine()
+        names = list(class_names)
+        for var_dec in subroutine.parameters + subroutine.locals:
+            for name in var_dec.names:
+                table.define(name, var_dec.type, var_dec.kind)
+                table.var_count(var_dec.kind)
+                names.append(name)
+        for name in names:
+            table.kind_of(name)
+            table.index_of(name)
+            table.type_of(name)
+
+
+def benchmark_components(text: str, repeat: int) -> typing.Dict[str, float]:
+    """Times each part of the compiler on a source text separately.
+
+    Returns:
+        typing.Dict[str, float]: the best time of each component, in seconds:
+        tokenizing, the symbol table operations of the class, the
+        CompilationEngine on already tokenized input, and compile_file.
+    """
+    tree = JackParser(JackTokenizer(io.StringIO(text))).parse_class()
+    return {
+        "tokenizer": best_time(JackTokenizer, repeat, lambda: (io.StringIO(text),)),
+        "symbol_table": best_time(replay_symbols, repeat, lambda: (tree,)),
+        "engine": best_time(CompilationEngine, repeat,
+                            lambda: (JackTokenizer(io.StringIO(text)), io.StringIO())),
+        "compile_file": best_time(compile_file, repeat,
+                                  lambda: (io.StringIO(text), io.StringIO())),
+    }
+
+
+def run_suite(scenarios: typing.Sequence[str], size: int, repeat: int,
+              scaling: bool = False) -> typing.Dict[str, typing.Dict[str, float]]:
+    """Times every component on every scenario and prints a table. With
+    scaling, each scenario is also run at twice the size and the growth of
+    every component is printed: about 2 is linear, about 4 is quadratic.
+
+    Returns:
+        typing.Dict[str, typing.Dict[str, float]]: the times of each
+        scenario, see benchmark_components.
+    """
+    results = {}
+    print(f"{'scenario':<12} {'component':<14} {'seconds':>10}" +
+          (f" {'growth':>8}" if scaling else ""))
+    for scenario in scenarios:
+        times = benchmark_components(SCENARIOS[scenario](size), repeat)
+        doubled = benchmark_components(SCENARIOS[scenario](2 * size), repeat) if scaling else {}
+        for component, seconds in times.items():
+            growth = f" {doubled[component] / seconds:>7.1f}x" if scaling else ""
+            print(f"{scenario:<12} {component:<14} {seconds:>10.4f}{growth}")
+        results[scenario] = times
+    return results
+
+
+def compare_baseline(results: typing.Dict[str, typing.Dict[str, float]],
+                     baseline: typing.Dict, tolerance: float) -> bool:
+    """Prints how every time changed since a saved baseline.
+
+    Args:
+        results (typing.Dict[str, typing.Dict[str, float]]): this run's times.
+        baseline (typing.Dict): a report saved by an earlier run.
+        tolerance (float): the largest ratio to the baseline time that is not
+        reported as a regression.
+
+    Returns:
+        bool: True if nothing regressed.
+    """
+    passed = True
+    for scenario, times in results.items():
+        for component, seconds in times.items():
+            before = baseline["results"].get(scenario, {}).get(component)
+            if before is None:
+                continue
+            ratio = seconds / before
+            regressed = ratio > tolerance
+            passed = passed and not regressed
+            print(f"{scenario:<12} {component:<14} {before:>10.4f} -> {seconds:>10.4f} "
+                  f"{ratio:>6.2f}x{'  REGRESSION' if regressed else ''}")
+    return passed
+
+
+def benchmark_tokenizer(line_counts: typing.Sequence[int], repeat: int = 3) -> None:
+    """Times the current tokenizer against the legacy one and checks that both
+    produce the same token stream.
+    """
+    print(f"{'lines':>8} {'legacy (s)':>12} {'current (s)':>12} {'speedup':>8}")
+    for line_count in line_counts:
+        text = generate_source(line_count)
+        legacy_tokens = legacy_token_split(text)
+        current_tokens = JackTokenizer(io.StringIO(text)).tokens
+        if legacy_tokens != current_tokens:
+            sys.exit(f"Token streams differ on {line_count} lines")
+        legacy = best_time(lambda: legacy_token_split(text), repeat)
+        current = best_time(lambda: JackTokenizer(io.StringIO(text)), repeat)
+        print(f"{line_count:>8} {legacy:>12.3f} {current:>12.3f} {legacy / current:>7.1f}x")
+
+
+def lex(text: str, mode: str) -> typing.List[typing.Tuple[str, str]]:
+    """
+    Args:
+        text (str): a source text.
+        mode (str): "text", "streaming" or "mapped", see JackTokenizer.
+
+    Returns:
+        typing.List[typing.Tuple[str, str]]: every token with its type, or a
+        single ("error", message) pair if the tokenizer raised ValueError.
+    """
+    with tempfile.TemporaryFile() as source:
+        source.write(text.encode())
+        source.seek(0)
+        try:
+            if mode == "mapped":
+                tokenizer = JackTokenizer(source, mapped=True)
+            else:
+                tokenizer = JackTokenizer(io.TextIOWrapper(source, encoding="utf-8"),
+                                          streaming=mode == "streaming")
+            tokens = []
+            while tokenizer.has_more_tokens():
+                tokenizer.advance()
+                if tokenizer.has_more_tokens() or tokenizer.current_token:
+                    tokens.append((tokenizer.current_token, tokenizer.token_type()))
+            return tokens
+        except ValueError as error:
+            return [("error", str(error))]
+
+
+def check_lexing_modes(texts: typing.Sequence[str]) -> bool:
+    """Tokenizes every text in every mode and prints those on which the
+    modes disagree.
+
+    Returns:
+        bool: True if all modes agree on every text.
+    """
+    passed = True
+    for text in texts:
+        results = {mode: lex(text, mode) for mode in ("text", "streaming", "mapped")}
+        if results["streaming"] != results["text"] or results["mapped"] != results["text"]:
+            passed = False
+            print(f"Lexing modes differ on {text!r}:")
+            for mode, tokens in results.items():
+                print(f"  {mode:<10} {tokens}")
+    return passed
+
+
+if "__main__" == __name__:
+    parser = argparse.ArgumentParser(
+        prog="Benchmark", description="Times the compiler on generated Jack classes.")
+    parser.add_argument("--scenario", action="append", choices=tuple(SCENARIOS),
+                        help="the generated class to time, may be repeated "
+                             "(default: all)")
+    parser.add_argument("--size", type=int, default=1000,
+                        help="the number of statements, fields, literals or "
+                             "branches to generate")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="time each component this many times and keep "
+                             "the best")
+    parser.add_argument("--scaling", action="store_true",
+                        help="also run at twice the size and print how much "
+                             "slower each component gets")
+    parser.add_argument("--save", metavar="FILE",
+                        help="store the times as a baseline")
+    parser.add_argument("--compare", metavar="FILE",
+                        help="compare the times with a stored baseline and "
+                             "fail if any regressed")
+    parser.add_argument("--tolerance", type=float, default=1.25,
+                        help="the slowdown --compare accepts (default 1.25x)")
+    parser.add_argument("--legacy", type=int, nargs="+", metavar="LINES",
+                        help="only compare the tokenizer with the legacy one "
+                             "on sources of these line counts")
+    parser.add_argument("--check-lexers", action="store_true",
+                        help="only check that the text, streaming and mapped "
+                             "tokenizers agree, on invalid sources too")
+    args = parser.parse_args()
+    if args.check_lexers:
+        sources = LEXER_CASES + [SCENARIOS[scenario](20) for scenario in SCENARIOS]
+        sys.exit(0 if check_lexing_modes(sources + [generate_source(100)]) else 1)
+    if args.legacy:
+        benchmark_tokenizer(args.legacy)
+        sys.exit()
+
+    results = run_suite(args.scenario or tuple(SCENARIOS), args.size,
+                        args.repeat, args.scaling)
+    report = {"size": args.size, "repeat": args.repeat, "results": results}
+    if args.save:
+        with open(args.save, 'w') as baseline_file:
+            json.dump(report, baseline_file, indent=1)
+    if args.compare:
+        with open(args.compare, 'r') as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get("size") != args.size:
+            sys.exit(f"The baseline was measured with --size {baseline.get('size')}")
+        if not compare_baseline(results, baseline, args.tolerance):
+            sys.exit(1)
@@ -0,0 +1,150 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import hashlib
+import json
+import os
+import typing
+
+MANIFEST_NAME = ".jackcache.json"
+# The modules the .vm, .vmb and .metrics.json files of a class are written
+# by. Tools that only read or time the output, like VMInterpreter or
+# Benchmark, are left out, so editing them keeps the cache valid.
+COMPILER_MODULES = ("ASTPasses", "CodeGenerator", "CompilationEngine",
+                    "ConstantFolding", "CostEstimator", "JackAST",
+                    "JackCompiler", "JackParser", "JackTokenizer",
+                    "PeepholeOptimizer", "StrengthReduction", "SymbolTable",
+                    "UnreachableCodeRemover", "VMBytecode", "VMWriter")
+
+
+def file_hash(path: str) -> str:
+    """
+    Args:
+        path (str): path of a file.
+
+    Returns:
+        str: the hex SHA-256 digest of the file's contents.
+    """
+    with open(path, 'rb') as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def compiler_version() -> str:
+    """
+    Returns:
+        str: a digest of the sources of COMPILER_MODULES, so that any change
+        to the compiler invalidates everything it compiled before.
+    """
+    digest = hashlib.sha256()
+    compiler_directory = os.path.dirname(os.path.abspath(__file__))
+    for module in COMPILER_MODULES:
+        with open(os.path.join(compiler_directory, module + ".py"), 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+class BuildCache:
+    """A persistent record of what was compiled in a directory, stored as a
+    JSON manifest next to the .vm files. For every class it keeps the hash of
+    the source, the compiler version and the hash of the output, so a class
+    whose source, compiler and .vm file are all unchanged can be skipped.
+    """
+
+    def __init__(self, directory: str, settings: typing.Dict = None) -> None:
+        """Loads the manifest of the given directory, if there is one.
+
+        Args:
+            directory (str): the directory the .vm files are written to.
+            settings (typing.Dict): the compiler options that affect the
+            output. Entries recorded under different settings are discarded.
+        """
+        self.path = os.path.join(directory, MANIFEST_NAME)
+        self.version = compiler_version()
+        self.settings = settings or {}
+        self.entries = self.load()
+
+    def load(self) -> typing.Dict[str, typing.Dict[str, str]]:
+        """
+        Returns:
+            typing.Dict[str, typing.Dict[str, str]]: the manifest's entries,
+            or an empty dict if the manifest is missing, unreadable, or was
+            written with different settings.
+        """
+        try:
+            with open(self.path, 'r') as manifest:
+                data = json.load(manifest)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(data, dict) or data.get("settings") != self.settings:
+            return {}
+        return data.get("classes", {})
+
+    def is_fresh(self, input_path: str, output_path: str, source_hash: str,
+                 report_path: str = None) -> bool:
+        """
+        Args:
+            input_path (str): path of a .jack file.
+            output_path (str): path of its .vm file.
+            source_hash (str): the current hash of the .jack file.
+            report_path (str): path of the report written along with the .vm
+            file, e.g. its .metrics.json file, if there is one.
+
+        Returns:
+            bool: True if the existing .vm file, and report if given, were
+            compiled from this exact source by this exact compiler and were
+            not modified since.
+        """
+        entry = self.entries.get(os.path.basename(input_path))
+        return entry is not None and \
+            entry["source"] == source_hash and \
+            entry["compiler"] == self.version and \
+            os.path.exists(output_path) and \
+            entry["output"] == file_hash(output_path) and \
+            (report_path is None or (os.path.exists(report_path) and
+                                     entry.get("report") == file_hash(report_path)))
+
+    def update(self, input_path: str, output_path: str, source_hash: str,
+               report_path: str = None) -> None:
+        """Records that output_path was just compiled from input_path.
+
+        Args:
+            input_path (str): path of a .jack file.
+            output_path (str): path of the .vm file it was compiled to.
+            source_hash (str): the hash of the .jack file that was compiled.
+            report_path (str): path of the report written along with the .vm
+            file, if there is one.
+        """
+        entry = {
+            "source": source_hash,
+            "compiler": self.version,
+            "output": file_hash(output_path),
+        }
+        if report_path is not None:
+            entry["report"] = file_hash(report_path)
+        self.entries[os.path.basename(input_path)] = entry
+
+    def discard(self, input_path: str) -> None:
+        """Forgets input_path, e.g. after it failed to compile.
+
+        Args:
+            input_path (str): path of a .jack file.
+        """
+        self.entries.pop(os.path.basename(input_path), None)
+
+    def save(self) -> None:
+        """Writes the manifest back to disk."""
+        temporary_path = self.path + ".tmp"
+        with open(temporary_path, 'w') as manifest:
+            json.dump({"settings": self.settings, "classes": self.entries},
+                      manifest, indent=1, sort_keys=True)
+        os.replace(temporary_path, self.path)
+
+    def clean(self) -> None:
+        """Deletes the manifest, so that everything is compiled again."""
+        self.entries = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,275 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import typing
+from ConstantFolding import write_constant
+from JackAST import (ArrayRef, Binary, Call, Class, Do, Expression, If,
+                     IntConst, KeywordConst, Let, Return, Statement,
+                     StringConst, Subroutine, Unary, VarRef, While)
+from StrengthReduction import write_divide_by_constant, write_multiply_by_constant
+from SymbolTable import SymbolTable
+
+
+class CodeGenerator:
+    """Lowers the abstract syntax tree of a class to VM code. The code is the
+    same as CompilationEngine writes for the same source and optimizations,
+    label numbers included, so both pipelines can be used interchangeably.
+    """
+    OP = {'+': 'ADD', '-': 'SUB', '*': '*', '/': '/', '&': 'AND', '|': 'OR', '<': 'LT', '>': 'GT', '=': "EQ"}
+    UNARY_OP = {'-': "NEG", '~': "NOT", '^': "SHIFTLEFT", '#': "SHIFTRIGHT"}
+    # See CompilationEngine.STRING_POOL_FUNCTION.
+    STRING_POOL_FUNCTION = "strings:pool"
+
+    def __init__(self, vm_writer, optimizations: typing.Collection[str] = ()) -> None:
+        """
+        Args:
+            vm_writer: a VMWriter, or anything with the same interface.
+            optimizations (typing.Collection[str]): the names of the enabled
+            CompilationEngine.OPTIMIZATIONS. The tree passes should already
+            have run (see ASTPasses.run_passes); only the ones that affect how
+            code is written are handled here.
+        """
+        self.vm_writer = vm_writer
+        self.optimizations = frozenset(optimizations)
+        self.strength = "strength" in self.optimizations
+        self.dce = "dce" in self.optimizations
+        self.fold = "fold" in self.optimizations or self.strength or self.dce
+        self.symbol_table = SymbolTable()
+        self.label_counter = 0
+        self.class_name = ""
+        self.string_pool = dict()
+
+    def generate(self, tree: Class) -> None:
+        """Writes the code of a complete class, and flushes the writer."""
+        self.class_name = tree.name
+        for var_dec in tree.var_decs:
+            kind = "this" if var_dec.kind == "field" else var_dec.kind
+            for name in var_dec.names:
+                self.symbol_table.define(name, var_dec.type, kind)
+        for subroutine in tree.subroutines:
+            self.generate_subroutine(subroutine)
+        if self.string_pool:
+            self.generate_string_pool()
+        self.vm_writer.flush()
+
+    def generate_subroutine(self, subroutine: Subroutine) -> None:
+        self.symbol_table.start_subroutine()
+        is_method = subroutine.keyword == "method"
+        for parameter in subroutine.parameters:
+            for name in parameter.names:
+                self.symbol_table.define(name, parameter.type, "argument", is_method)
+        for var_dec in subroutine.locals:
+            for name in var_dec.names:
+                self.symbol_table.define(name, var_dec.type, "local")
+
+        self.vm_writer.write_function(f"{self.class_name}.{subroutine.name}",
+                                      self.symbol_table.var_count("local"))
+        if subroutine.keyword == "constructor":
+            self.vm_writer.write_push("constant", self.symbol_table.var_count("this"))
+            self.vm_writer.write_call("Memory.alloc", 1)
+            self.vm_writer.write_pop("pointer", 0)
+        elif is_method:
+            self.vm_writer.write_push("argument", 0)
+            self.vm_writer.write_pop("pointer", 0)
+        self.generate_statements(subroutine.statements)
+
+    def generate_statements(self, statements: typing.List[Statement]) -> None:
+        for statement in statements:
+            if isinstance(statement, Let):
+                self.generate_let(statement)
+            elif isinstance(statement, If):
+                self.generate_if(statement)
+            elif isinstance(statement, While):
+                self.generate_while(statement)
+            elif isinstance(statement, Do):
+                self.generate_call(statement.call)
+                self.vm_writer.write_pop("TEMP", 0)
+            elif isinstance(statement, Return):
+                if statement.value is None:
+                    self.vm_writer.write_push("CONSTANT", 0)
+                else:
+                    self.generate_expression(statement.value)
+                self.vm_writer.write_return()
+
+    def generate_let(self, statement: Let) -> None:
+        if statement.index is None:
+            self.generate_expression(statement.value)
+            self.write_pop_variable(statement.name)
+            return
+        self.write_push_variable(statement.name)
+        self.generate_expression(statement.index)
+        self.vm_writer.write_arithmetic("ADD")
+        self.generate_expression(statement.value)
+        self.vm_writer.write_pop("TEMP", 0)
+        self.vm_writer.write_pop("POINTER", 1)
+        self.vm_writer.write_push("TEMP", 0)
+        self.vm_writer.write_pop("THAT", 0)
+
+    def generate_if(self, statement: If) -> None:
+        if_index = self.label_counter
+        self.label_counter += 1
+        self.generate_expression(statement.condition)
+        self.vm_writer.write_arithmetic("NOT")
+        self.vm_writer.write_if(f"IF_FALSE{if_index}")
+        self.generate_statements(statement.then_statements)
+        self.vm_writer.write_goto(f"IF_END{if_index}")
+        self.vm_writer.write_label(f"IF_FALSE{if_index}")
+        if statement.else_statements is not None:
+            self.generate_statements(statement.else_statements)
+        self.vm_writer.write_label(f"IF_END{if_index}")
+
+    def generate_while(self, statement: While) -> None:
+        while_index = self.label_counter
+        self.label_counter += 1
+        self.vm_writer.write_label(f"WHILE_EXP{while_index}")
+        if not (self.dce and isinstance(statement.condition, IntConst)):
+            # With "dce", a loop with a constant condition is only left for
+            # an infinite one, which needs no test.
+            self.generate_expression(statement.condition)
+            self.vm_writer.write_arithmetic("NOT")
+            self.vm_writer.write_if(f"WHILE_END{while_index}")
+        self.generate_statements(statement.statements)
+        self.vm_writer.write_goto(f"WHILE_EXP{while_index}")
+        self.vm_writer.write_label(f"WHILE_END{while_index}")
+
+    def generate_expression(self, expression: Expression) -> None:
+        """Writes code that pushes the value of an expression."""
+        if isinstance(expression, IntConst):
+            write_constant(self.vm_writer, expression.value)
+        elif isinstance(expression, StringConst):
+            if "strings" in self.optimizations:
+                self.generate_pooled_string(expression.value)
+            else:
+                self.generate_string(expression.value)
+        elif isinstance(expression, KeywordConst):
+            if expression.keyword in ['false', 'null']:
+                self.vm_writer.write_push("CONSTANT", 0)
+            elif expression.keyword == 'true':
+                self.vm_writer.write_push("CONSTANT", 0)
+                self.vm_writer.write_arithmetic("NOT")
+            else:
+                self.vm_writer.write_push("POINTER", 0)
+        elif isinstance(expression, VarRef):
+            self.write_push_variable(expression.name)
+        elif isinstance(expression, ArrayRef):
+            self.write_push_variable(expression.name)
+            self.generate_expression(expression.index)
+            self.vm_writer.write_arithmetic("ADD")
+            self.vm_writer.write_pop("pointer", 1)
+            self.vm_writer.write_push("that", 0)
+        elif isinstance(expression, Call):
+            self.generate_call(expression)
+        elif isinstance(expression, Unary):
+            self.generate_expression(expression.operand)
+            self.vm_writer.write_arithmetic(CodeGenerator.UNARY_OP[expression.op])
+        elif isinstance(expression, Binary):
+            self.generate_binary(expression)
+
+    def generate_binary(self, expression: Binary) -> None:
+        """Writes "left op right". Once folded, a constant operand is the
+        only constant one (or the operation cannot be folded), and is handled
+        like CompilationEngine.compile_constant_left_operand and
+        compile_constant_right_operand do.
+        """
+        op = expression.op
+        command = CodeGenerator.OP[op]
+        left_constant = self.fold and isinstance(expression.left, IntConst)
+        right_constant = self.fold and isinstance(expression.right, IntConst)
+        if left_constant and not right_constant:
+            self.generate_expression(expression.right)
+            self.write_constant_left_operand(op, command, expression.left.value)
+            return
+        self.generate_expression(expression.left)
+        if right_constant and not left_constant and self.strength:
+            if op == '*' and write_multiply_by_constant(self.vm_writer, expression.right.value):
+                return
+            if op == '/' and write_divide_by_constant(self.vm_writer, expression.right.value):
+                return
+        self.generate_expression(expression.right)
+        self.vm_writer.write_arithmetic(command)
+
+    def write_constant_left_operand(self, op: str, command: str, left: int) -> None:
+        """Completes "left op right" when right was already pushed, see
+        CompilationEngine.compile_constant_left_operand.
+        """
+        if op == '-':
+            self.vm_writer.write_arithmetic("NEG")
+            if left != 0:
+                write_constant(self.vm_writer, left)
+                self.vm_writer.write_arithmetic("ADD")
+        elif op in '<>':
+            write_constant(self.vm_writer, left)
+            self.vm_writer.write_arithmetic("GT" if op == '<' else "LT")
+        elif op == '/':
+            self.vm_writer.write_pop("TEMP", 1)
+            write_constant(self.vm_writer, left)
+            self.vm_writer.write_push("TEMP", 1)
+            self.vm_writer.write_arithmetic(command)
+        elif op == '*' and self.strength and \
+                write_multiply_by_constant(self.vm_writer, left):
+            pass
+        else:
+            write_constant(self.vm_writer, left)
+            self.vm_writer.write_arithmetic(command)
+
+    def generate_call(self, call: Call) -> None:
+        argument_count = len(call.arguments)
+        if call.receiver is None:
+            function_name = f"{self.class_name}.{call.name}"
+            self.vm_writer.write_push("pointer", 0)
+            argument_count += 1
+        elif self.symbol_table.contains(call.receiver):
+            function_name = f"{self.symbol_table.type_of(call.receiver)}.{call.name}"
+            self.write_push_variable(call.receiver)
+            argument_count += 1
+        else:
+            function_name = f"{call.receiver}.{call.name}"
+        for argument in call.arguments:
+            self.generate_expression(argument)
+        self.vm_writer.write_call(function_name, argument_count)
+
+    def generate_string(self, current_str: str) -> None:
+        """Builds a new String object holding current_str on the stack."""
+        self.vm_writer.write_push("CONSTANT", len(current_str))
+        self.vm_writer.write_call("String.new", 1)
+        for c in current_str:
+            self.vm_writer.write_push("CONSTANT", ord(c))
+            self.vm_writer.write_call("String.appendChar", 2)
+
+    def generate_pooled_string(self, current_str: str) -> None:
+        """Pushes the pooled String object holding current_str, see
+        CompilationEngine.compile_pooled_string.
+        """
+        index = self.string_pool.get(current_str)
+        if index is None:
+            index = self.symbol_table.var_count("static") + len(self.string_pool)
+            self.string_pool[current_str] = index
+        string_index = self.label_counter
+        self.label_counter += 1
+        self.vm_writer.write_push("static", index)
+        self.vm_writer.write_if(f"STRING_READY{string_index}")
+        self.vm_writer.write_call(f"{self.class_name}.{self.STRING_POOL_FUNCTION}", 0)
+        self.vm_writer.write_pop("TEMP", 0)
+        self.vm_writer.write_label(f"STRING_READY{string_index}")
+        self.vm_writer.write_push("static", index)
+
+    def generate_string_pool(self) -> None:
+        """Writes the function that builds every pooled literal of the class,
+        see CompilationEngine.compile_string_pool.
+        """
+        self.vm_writer.write_function(f"{self.class_name}.{self.STRING_POOL_FUNCTION}", 0)
+        for current_str, index in self.string_pool.items():
+            self.generate_string(current_str)
+            self.vm_writer.write_pop("static", index)
+        self.vm_writer.write_push("CONSTANT", 0)
+        self.vm_writer.write_return()
+
+    def write_push_variable(self, name: str) -> None:
+        self.vm_writer.write_push(self.symbol_table.kind_of(name), self.symbol_table.index_of(name))
+
+    def write_pop_variable(self, name: str) -> None:
+        self.vm_writer.write_pop(self.symbol_table.kind_of(name), self.symbol_table.index_of(name))
@@ -7,6 +7,9 @@ Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
 """
 import typing
 import JackTokenizer
+from ConstantFolding import fold_binary, fold_unary, write_constant
+from PeepholeOptimizer import PeepholeOptimizer
+from StrengthReduction import write_divide_by_constant, write_multiply_by_constant
 from SymbolTable import SymbolTable
 from VMWriter import VMWriter
 
@@ -15,23 +18,55 @@ class CompilationEngine:
     """Gets input from a JackTokenizer and emits its parsed structure into an
     output stream.
     """
-
-    def __init__(self, input_stream: JackTokenizer, output_stream) -> None:
+    # The optional optimizations, all disabled by default:
+    # - peephole: removes redundant VM command sequences, see PeepholeOptimizer.
+    # - fold: evaluates constant sub-expressions at compile time.
+    # - strength: replaces Math.multiply and Math.divide calls that have a
+    #   constant operand with shifts and adds, see StrengthReduction. Constant
+    #   operands are only known when folding, so this implies "fold".
+    # - strings: builds every distinct string literal of a class once, into a
+    #   hidden static variable, and reuses it afterwards. Pooled strings are
+    #   shared, so code that modifies or disposes of a literal must not use it.
+    # - dce: removes code that can never run: branches of ifs with a constant
+    #   condition, loops that never run, statements after a return, and
+    #   labels nothing jumps to. This needs the whole tree of a subroutine, so
+    #   it is only applied by the AST pipeline (see JackCompiler.compile_file),
+    #   and implies "fold".
+    OPTIMIZATIONS = ("peephole", "fold", "strength", "strings", "dce")
+    # The subroutine generated for the "strings" optimization. VM names may
+    # hold ':' but Jack identifiers may not, so it cannot clash with the
+    # class's own subroutines.
+    STRING_POOL_FUNCTION = "strings:pool"
+
+    def __init__(self, input_stream: JackTokenizer, output_stream,
+                 flush_threshold: int = 0,
+                 optimizations: typing.Collection[str] = (),
+                 vm_writer=None) -> None:
         """
         Creates a new compilation engine with the given input and output. The
         next routine called must be compileClass()
         :param input_stream: The input stream.
         :param output_stream: The output stream.
+        :param flush_threshold: passed on to the VMWriter.
+        :param optimizations: the names of the OPTIMIZATIONS to apply.
+        :param vm_writer: the writer to write to instead of a new VMWriter
+        of output_stream, e.g. one behind a CostEstimator.
         """
         # Your code goes here!
         # Note that you can write to output_stream like so:
         # output_stream.write("Hello world! \n")
-        self.vm_writer = VMWriter(output_stream)
+        self.optimizations = frozenset(optimizations)
+        self.strength = "strength" in self.optimizations
+        self.fold = "fold" in self.optimizations or self.strength
+        self.vm_writer = vm_writer or VMWriter(output_stream, flush_threshold)
+        if "peephole" in self.optimizations:
+            self.vm_writer = PeepholeOptimizer(self.vm_writer)
         self.input_stream = input_stream
         self.input_stream.advance()
         self.symbol_table = SymbolTable()
         self.label_counter = 0
         self.class_name = ""
+        self.string_pool = dict()
         self.compile_class()
 
     def compile_class(self) -> None:
@@ -52,6 +87,10 @@ class CompilationEngine:
                 self.input_stream.keyword() in ['constructor', 'function', 'method']:
             self.compile_subroutine()
 
+        if self.string_pool:
+            self.compile_string_pool()
+        self.vm_writer.flush()
+
     def compile_class_var_dec(self) -> None:
         """Compiles a static declaration or a field declaration."""
         kind = self.input_stream.keyword()
@@ -285,17 +324,93 @@ class CompilationEngine:
 
     def compile_expression(self) -> None:
         """Compiles an expression."""
+        value = self.compile_folded_expression()
+        if value is not None:
+            write_constant(self.vm_writer, value)
+
+    def compile_folded_expression(self) -> typing.Optional[int]:
+        """Compiles an expression, folding constant sub-expressions when the
+        "fold" optimization is enabled.
+
+        Returns:
+            typing.Optional[int]: the value of the expression if it is a
+            constant, in which case no code was written for it, or None.
+        """
         OP = {'+': 'ADD', '-': 'SUB', '*': '*', '/': '/', '&': 'AND', '|': 'OR', '<': 'LT', '>': 'GT', '=': "EQ"}
 
-        self.compile_term()
+        left = self.compile_term()
         while self.input_stream.token_type() == "SYMBOL" and \
                 self.input_stream.symbol() in OP.keys():
-            op_name = OP[self.input_stream.symbol()]
+            op = self.input_stream.symbol()
             self.input_stream.advance()
-            self.compile_term()
-            self.vm_writer.write_arithmetic(op_name)
+            right = self.compile_term()
+            if left is not None and right is not None:
+                value = fold_binary(op, left, right)
+                if value is not None:
+                    left = value
+                    continue
+                write_constant(self.vm_writer, left)
+                write_constant(self.vm_writer, right)
+                self.vm_writer.write_arithmetic(OP[op])
+            elif left is not None:
+                self.compile_constant_left_operand(op, OP[op], left)
+            elif right is not None:
+                self.compile_constant_right_operand(op, OP[op], right)
+            else:
+                self.vm_writer.write_arithmetic(OP[op])
+            left = None
+        return left
+
+    def compile_constant_right_operand(self, op: str, command: str, right: int) -> None:
+        """Completes "left op right" when left was already pushed and right
+        is a folded constant that was not written.
+
+        Args:
+            op (str): the Jack operator.
+            command (str): the VM command for op.
+            right (int): the constant right operand.
+        """
+        if self.strength:
+            if op == '*' and write_multiply_by_constant(self.vm_writer, right):
+                return
+            if op == '/' and write_divide_by_constant(self.vm_writer, right):
+                return
+        write_constant(self.vm_writer, right)
+        self.vm_writer.write_arithmetic(command)
+
+    def compile_constant_left_operand(self, op: str, command: str, left: int) -> None:
+        """Completes "left op right" when left is a folded constant that was
+        not written, and right was already pushed. Constants have no side
+        effects, so the operands are reordered instead of evaluated in order.
+
+        Args:
+            op (str): the Jack operator.
+            command (str): the VM command for op.
+            left (int): the constant left operand.
+        """
+        if op == '-':
+            # left - right == -right + left
+            self.vm_writer.write_arithmetic("NEG")
+            if left != 0:
+                write_constant(self.vm_writer, left)
+                self.vm_writer.write_arithmetic("ADD")
+        elif op in '<>':
+            # left < right == right > left, and vice versa
+            write_constant(self.vm_writer, left)
+            self.vm_writer.write_arithmetic("GT" if op == '<' else "LT")
+        elif op == '/':
+            self.vm_writer.write_pop("TEMP", 1)
+            write_constant(self.vm_writer, left)
+            self.vm_writer.write_push("TEMP", 1)
+            self.vm_writer.write_arithmetic(command)
+        elif op == '*' and self.strength and \
+                write_multiply_by_constant(self.vm_writer, left):
+            pass
+        else:
+            write_constant(self.vm_writer, left)
+            self.vm_writer.write_arithmetic(command)
 
-    def compile_term(self) -> None:
+    def compile_term(self) -> typing.Optional[int]:
         """Compiles a term.
         This routine is faced with a slight difficulty when
         trying to decide between some of the alternative parsing rules.
@@ -304,25 +419,36 @@ class CompilationEngine:
         A single look-ahead token, which may be one of "[", "(", or "." suffices
         to distinguish between the three possibilities. Any other token is not
         part of this term and should not be advanced over.
+
+        Returns:
+            typing.Optional[int]: with the "fold" optimization, the value of
+            the term if it is a constant, in which case no code was written
+            for it. None otherwise.
         """
 
         KEYWORD_CONSTANT = ['true', 'false', 'null', 'this']
         UNARY_OP = {'-': "NEG", '~': "NOT", '^': "SHIFTLEFT", '#': "SHIFTRIGHT"}
         if self.input_stream.token_type() == "INT_CONST":
-            self.vm_writer.write_push("CONSTANT", self.input_stream.int_val())
+            value = self.input_stream.int_val()
             self.input_stream.advance()
+            if self.fold:
+                return value
+            self.vm_writer.write_push("CONSTANT", value)
 
         elif self.input_stream.token_type() == "STRING_CONST":
             current_str = self.input_stream.string_val()
-            self.vm_writer.write_push("CONSTANT", len(current_str))
-            self.vm_writer.write_call("String.new", 1)
-            for c in current_str:
-                self.vm_writer.write_push("CONSTANT", ord(c))  # todo: check if it works with char
-                self.vm_writer.write_call("String.appendChar", 2)
+            if "strings" in self.optimizations:
+                self.compile_pooled_string(current_str)
+            else:
+                self.compile_string(current_str)
             self.input_stream.advance()
 
         elif self.input_stream.token_type() == "KEYWORD" and \
                 self.input_stream.keyword() in KEYWORD_CONSTANT:
+            if self.fold and self.input_stream.keyword() != 'this':
+                value = -1 if self.input_stream.keyword() == 'true' else 0
+                self.input_stream.advance()
+                return value
             if self.input_stream.keyword() in ['false', 'null']:
                 self.vm_writer.write_push("CONSTANT", 0)
             elif self.input_stream.keyword() == 'true':
@@ -357,14 +483,60 @@ class CompilationEngine:
         elif self.input_stream.token_type() == "SYMBOL":
             if self.input_stream.symbol() == '(':
                 self.input_stream.advance()
-                self.compile_expression()
+                value = self.compile_folded_expression()
                 self.input_stream.advance()
+                return value
 
             elif self.input_stream.symbol() in UNARY_OP:
                 op = self.input_stream.symbol()
                 self.input_stream.advance()
-                self.compile_term()  # todo: check if its good
+                value = self.compile_term()  # todo: check if its good
+                if value is not None:
+                    return fold_unary(op, value)
                 self.vm_writer.write_arithmetic(UNARY_OP[op])
+        return None
+
+    def compile_string(self, current_str: str) -> None:
+        """Builds a new String object holding current_str on the stack."""
+        self.vm_writer.write_push("CONSTANT", len(current_str))
+        self.vm_writer.write_call("String.new", 1)
+        for c in current_str:
+            self.vm_writer.write_push("CONSTANT", ord(c))  # todo: check if it works with char
+            self.vm_writer.write_call("String.appendChar", 2)
+
+    def compile_pooled_string(self, current_str: str) -> None:
+        """Pushes the pooled String object holding current_str. Each distinct
+        literal gets a static variable after the class's declared statics,
+        which are all known by the time subroutines are compiled. The first
+        time any pooled literal is used, the class's string pool function
+        (see compile_string_pool) builds all of them. Heap addresses are
+        never 0, so a non-zero static means the pool is ready, and from then
+        on a literal costs three commands.
+        """
+        index = self.string_pool.get(current_str)
+        if index is None:
+            index = self.symbol_table.var_count("static") + len(self.string_pool)
+            self.string_pool[current_str] = index
+        string_index = self.label_counter
+        self.label_counter += 1
+        self.vm_writer.write_push("static", index)
+        self.vm_writer.write_if(f"STRING_READY{string_index}")
+        self.vm_writer.write_call(f"{self.class_name}.{self.STRING_POOL_FUNCTION}", 0)
+        self.vm_writer.write_pop("TEMP", 0)
+        self.vm_writer.write_label(f"STRING_READY{string_index}")
+        self.vm_writer.write_push("static", index)
+
+    def compile_string_pool(self) -> None:
+        """Writes the function that builds every pooled literal of the class
+        into its static variable. Each literal's construction code is written
+        once here instead of at every place it is used.
+        """
+        self.vm_writer.write_function(f"{self.class_name}.{self.STRING_POOL_FUNCTION}", 0)
+        for current_str, index in self.string_pool.items():
+            self.compile_string(current_str)
+            self.vm_writer.write_pop("static", index)
+        self.vm_writer.write_push("CONSTANT", 0)
+        self.vm_writer.write_return()
 
     def compile_expression_list(self) -> int:
         """Compiles a (possibly empty) comma-separated list of expressions."""
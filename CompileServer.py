@@ -0,0 +1,263 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import argparse
+import collections
+import hashlib
+import io
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+import threading
+import time
+import typing
+from ASTPasses import run_passes
+from CodeGenerator import CodeGenerator
+from CompilationEngine import CompilationEngine
+from JackAST import Class
+from JackCompiler import make_writer, vm_path
+from JackParser import JackParser
+from JackTokenizer import JackTokenizer
+
+# How many compiled classes a server keeps by default, see CompileServer.
+CACHE_SIZE = 1024
+
+
+def class_interface(tree: Class) -> typing.Dict:
+    """
+    Args:
+        tree (Class): a parsed class.
+
+    Returns:
+        typing.Dict: what other classes can use of it: its name, and the
+        kind, return type and parameter types of every subroutine.
+    """
+    return {
+        "name": tree.name,
+        "subroutines": {
+            subroutine.name: {
+                "kind": subroutine.keyword,
+                "return_type": subroutine.return_type,
+                "parameters": [parameter.type for parameter in subroutine.parameters],
+            } for subroutine in tree.subroutines},
+    }
+
+
+class CompileServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """A compiler that stays running, listening on a Unix socket, so that
+    every compilation is not preceded by starting Python and importing the
+    compiler.
+
+    Each line a client sends is a JSON request, answered by one JSON line:
+
+    - {"compile": PATH, "optimizations": [...], "write": false} compiles a
+      .jack file or every .jack file of a directory, and answers with
+      {"classes": {path: {"vm": ..., "interface": ..., "cached": ...}},
+      "diagnostics": [{"path": ..., "message": ...}], "seconds": ...}. With
+      "write", the .vm files are written to disk too.
+    - {"stats": true} answers with the number of cached classes, hits and
+      misses.
+    - {"shutdown": true} stops the server.
+
+    The output and the interface of the most recently used compiled classes
+    are kept in memory for each set of optimizations. A cached class is
+    reused while its file's modification time and size are unchanged;
+    otherwise the file is hashed, and only recompiled if its contents
+    changed.
+    """
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, cache_size: int = CACHE_SIZE) -> None:
+        """
+        Args:
+            socket_path (str): where to create the socket. A stale socket
+            file left there by a previous server is removed.
+            cache_size (int): how many compiled classes to keep; the least
+            recently used one is dropped first.
+
+        Raises:
+            FileExistsError: if something other than a stale socket is at
+            socket_path, i.e. a file or a socket a server is listening on.
+        """
+        if os.path.lexists(socket_path):
+            if not stat.S_ISSOCK(os.lstat(socket_path).st_mode):
+                raise FileExistsError(f"{socket_path} exists and is not a socket")
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                try:
+                    probe.connect(socket_path)
+                except ConnectionRefusedError:
+                    os.remove(socket_path)
+                else:
+                    raise FileExistsError(f"{socket_path} is in use by another server")
+        self.socket_path = socket_path
+        self.cache_size = cache_size
+        self.cache = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        super().__init__(socket_path, CompileRequestHandler)
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+    def compile_class(self, input_path: str,
+                      optimizations: typing.Tuple[str, ...]) -> typing.Dict:
+        """Compiles one .jack file, or takes it from the cache.
+
+        Returns:
+            typing.Dict: the "vm" output, the "interface" of the class and
+            whether it was "cached".
+        """
+        status = os.stat(input_path)
+        key = (input_path, optimizations)
+        entry = self.cache.get(key)
+        if entry is not None:
+            self.cache.move_to_end(key)
+        if entry is not None and \
+                (entry["mtime"], entry["size"]) == (status.st_mtime_ns, status.st_size):
+            self.hits += 1
+            return {"vm": entry["vm"], "interface": entry["interface"], "cached": True}
+        with open(input_path, 'rb') as input_file:
+            source = input_file.read()
+        source_hash = hashlib.sha256(source).hexdigest()
+        if entry is not None and entry["hash"] == source_hash:
+            entry["mtime"], entry["size"] = status.st_mtime_ns, status.st_size
+            self.hits += 1
+            return {"vm": entry["vm"], "interface": entry["interface"], "cached": True}
+
+        self.misses += 1
+        # The AST pipeline writes the same code as CompilationEngine and
+        # gives the class interface on the way.
+        tree = JackParser(JackTokenizer(io.StringIO(source.decode()))).parse_class()
+        interface = class_interface(tree)
+        run_passes(tree, optimizations)
+        output = io.StringIO()
+        CodeGenerator(make_writer(output, 0, optimizations), optimizations).generate(tree)
+        self.cache[key] = {"mtime": status.st_mtime_ns, "size": status.st_size,
+                           "hash": source_hash, "vm": output.getvalue(),
+                           "interface": interface}
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return {"vm": output.getvalue(), "interface": interface, "cached": False}
+
+    def handle_request_message(self, request: typing.Dict) -> typing.Dict:
+        """
+        Args:
+            request (typing.Dict): a decoded request, see CompileServer.
+
+        Returns:
+            typing.Dict: the response to send back.
+        """
+        if request.get("shutdown"):
+            threading.Thread(target=self.shutdown).start()
+            return {"shutdown": True}
+        if request.get("stats"):
+            return {"classes": len(self.cache), "hits": self.hits, "misses": self.misses}
+
+        start = time.perf_counter()
+        path = os.path.abspath(request["compile"])
+        optimizations = request.get("optimizations", [])
+        for name in optimizations:
+            if name not in CompilationEngine.OPTIMIZATIONS + ("all",):
+                raise ValueError(f"Unknown optimization {name!r}")
+        if "all" in optimizations:
+            optimizations = CompilationEngine.OPTIMIZATIONS
+        optimizations = tuple(sorted(set(optimizations)))
+        if os.path.isdir(path):
+            input_paths = [os.path.join(path, filename) for filename in sorted(os.listdir(path))
+                           if os.path.splitext(filename)[1].lower() == ".jack"]
+        else:
+            input_paths = [path]
+        classes = {}
+        diagnostics = []
+        for input_path in input_paths:
+            try:
+                with self.lock:
+                    result = self.compile_class(input_path, optimizations)
+                if request.get("write"):
+                    with open(vm_path(input_path), 'w') as output_file:
+                        output_file.write(result["vm"])
+                classes[input_path] = result
+            except Exception as error:
+                diagnostics.append({"path": input_path,
+                                    "message": f"{type(error).__name__}: {error}"})
+        return {"classes": classes, "diagnostics": diagnostics,
+                "seconds": time.perf_counter() - start}
+
+
+class CompileRequestHandler(socketserver.StreamRequestHandler):
+    """Answers the requests of a single client connection, see
+    CompileServer.
+    """
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                response = self.server.handle_request_message(json.loads(line))
+            except (AttributeError, KeyError, TypeError, ValueError) as error:
+                response = {"error": f"Bad request: {error}"}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+def send_request(socket_path: str, request: typing.Dict) -> typing.Dict:
+    """Sends a single request to a running CompileServer.
+
+    Args:
+        socket_path (str): the server's socket.
+        request (typing.Dict): the request, see CompileServer.
+
+    Returns:
+        typing.Dict: the server's response.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path)
+        connection.sendall(json.dumps(request).encode() + b"\n")
+        with connection.makefile('rb') as responses:
+            return json.loads(responses.readline())
+
+
+if "__main__" == __name__:
+    parser = argparse.ArgumentParser(
+        prog="CompileServer",
+        description="Serves Jack compilations over a Unix socket.")
+    parser.add_argument("socket_path", help="the socket to listen on")
+    parser.add_argument("--compile", metavar="PATH",
+                        help="instead of serving, ask the server at the socket "
+                             "to compile PATH and print its response")
+    parser.add_argument("-O", "--optimize", action="append", default=[],
+                        choices=CompilationEngine.OPTIMIZATIONS + ("all",),
+                        metavar="NAME", help="an optimization for --compile")
+    parser.add_argument("--write", action="store_true",
+                        help="with --compile, also write the .vm files")
+    parser.add_argument("--cache-size", type=int, default=CACHE_SIZE,
+                        metavar="N",
+                        help="the number of compiled classes the server "
+                             f"keeps (default {CACHE_SIZE})")
+    args = parser.parse_args()
+    if args.compile:
+        response = send_request(args.socket_path, {
+            "compile": os.path.abspath(args.compile),
+            "optimizations": args.optimize, "write": args.write})
+        json.dump(response, sys.stdout, indent=1)
+        sys.stdout.write("\n")
+        sys.exit(1 if response.get("diagnostics") or "error" in response else 0)
+    try:
+        server = CompileServer(args.socket_path, args.cache_size)
+    except FileExistsError as error:
+        sys.exit(str(error))
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,99 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import typing
+
+# Jack's true, as computed by the VM's comparison commands.
+TRUE = -1
+
+
+def to_word(value: int) -> int:
+    """
+    Args:
+        value (int): any integer.
+
+    Returns:
+        int: value wrapped to a 16-bit two's-complement word, i.e. into the
+        range -32768..32767, like the Hack ALU does.
+    """
+    return ((value + 0x8000) & 0xFFFF) - 0x8000
+
+
+def fold_binary(op: str, left: int, right: int) -> typing.Optional[int]:
+    """Evaluates a binary Jack operator at compile time.
+
+    Args:
+        op (str): one of '+', '-', '*', '/', '&', '|', '<', '>', '='.
+        left (int): the value of the left operand, as a 16-bit word.
+        right (int): the value of the right operand, as a 16-bit word.
+
+    Returns:
+        typing.Optional[int]: the 16-bit result, or None if the operation
+        must be left to run time (division by zero, which the OS reports).
+    """
+    if op == '+':
+        return to_word(left + right)
+    if op == '-':
+        return to_word(left - right)
+    if op == '*':
+        return to_word(left * right)
+    if op == '/':
+        if right == 0:
+            return None
+        # Math.divide rounds towards zero.
+        quotient = abs(left) // abs(right)
+        return to_word(quotient if (left < 0) == (right < 0) else -quotient)
+    if op == '&':
+        return left & right
+    if op == '|':
+        return left | right
+    if op == '<':
+        return TRUE if left < right else 0
+    if op == '>':
+        return TRUE if left > right else 0
+    if op == '=':
+        return TRUE if left == right else 0
+    return None
+
+
+def fold_unary(op: str, value: int) -> int:
+    """Evaluates a unary Jack operator at compile time.
+
+    Args:
+        op (str): one of '-', '~', '^' (shift left), '#' (shift right).
+        value (int): the value of the operand, as a 16-bit word.
+
+    Returns:
+        int: the 16-bit result. Shifting right is arithmetic, i.e. it keeps
+        the sign bit, like the VM's shiftright command.
+    """
+    if op == '-':
+        return to_word(-value)
+    if op == '~':
+        return ~value
+    if op == '^':
+        return to_word(value << 1)
+    return value >> 1
+
+
+def write_constant(writer, value: int) -> None:
+    """Writes the shortest VM code that pushes a 16-bit constant. Only
+    0..32767 can be pushed directly, -1 and -32768 are the complement of a
+    push, and every other negative number is a negated push.
+
+    Args:
+        writer: a VMWriter, or anything with the same interface.
+        value (int): the constant, as a 16-bit word.
+    """
+    if value >= 0:
+        writer.write_push("CONSTANT", value)
+    elif value == TRUE or value == -0x8000:
+        writer.write_push("CONSTANT", ~value)
+        writer.write_arithmetic("NOT")
+    else:
+        writer.write_push("CONSTANT", -value)
+        writer.write_arithmetic("NEG")
@@ -0,0 +1,109 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+# Arithmetic commands that replace the top of the stack instead of popping
+# two values and pushing one.
+UNARY_COMMANDS = frozenset(["neg", "not", "shiftleft", "shiftright"])
+# The OS calls a string constant is built with, see
+# CompilationEngine.compile_string.
+STRING_CALLS = frozenset(["String.new", "String.appendChar"])
+
+
+class CostEstimator:
+    """Sits in front of a VMWriter, has the same interface and passes every
+    command on unchanged, while measuring each function it writes:
+
+    - instructions: the number of VM commands, the "function" one included.
+    - max_stack_depth: the most values the function has on its operand
+      stack at once. The compiler reaches every label with the same depth
+      by jumping as by falling through, so following the commands in order
+      gives the depth on every path.
+    - calls: the number of "call" commands, including the ones that "*" and
+      "/" are written as.
+    - strings: the number of strings built, i.e. calls to String.new, which
+      is how every string constant starts.
+    - string_instructions: the commands spent on String.new and
+      String.appendChar calls: each call and the push of its last argument.
+      For a constant that is two commands per character plus two.
+    """
+
+    def __init__(self, writer) -> None:
+        """
+        Args:
+            writer: the VMWriter (or anything with the same interface) that
+            receives the commands.
+        """
+        self.writer = writer
+        self.metrics = dict()
+        self.current = None
+        self.depth = 0
+
+    def count(self, stack_change: int) -> None:
+        """Counts a command of the current function that changes the depth of
+        its stack by stack_change.
+        """
+        current = self.current
+        current["instructions"] += 1
+        self.depth += stack_change
+        if self.depth > current["max_stack_depth"]:
+            current["max_stack_depth"] = self.depth
+
+    def count_call(self, name: str, n_args: int) -> None:
+        self.count(1 - n_args)
+        self.current["calls"] += 1
+        if name in STRING_CALLS:
+            # The call and the push of its last argument.
+            self.current["string_instructions"] += 2
+            if name == "String.new":
+                self.current["strings"] += 1
+
+    def flush(self) -> None:
+        self.writer.flush()
+
+    def write_push(self, segment: str, index: int) -> None:
+        self.count(1)
+        self.writer.write_push(segment, index)
+
+    def write_pop(self, segment: str, index: int) -> None:
+        self.count(-1)
+        self.writer.write_pop(segment, index)
+
+    def write_arithmetic(self, command: str) -> None:
+        if command == "*" or command == "/":
+            self.count_call("Math.multiply" if command == "*" else "Math.divide", 2)
+        else:
+            self.count(0 if command.lower() in UNARY_COMMANDS else -1)
+        self.writer.write_arithmetic(command)
+
+    def write_label(self, label: str) -> None:
+        self.count(0)
+        self.writer.write_label(label)
+
+    def write_goto(self, label: str) -> None:
+        self.count(0)
+        self.writer.write_goto(label)
+
+    def write_if(self, label: str) -> None:
+        self.count(-1)
+        self.writer.write_if(label)
+
+    def write_call(self, name: str, n_args: int) -> None:
+        self.count_call(name, n_args)
+        self.writer.write_call(name, n_args)
+
+    def write_function(self, name: str, n_locals: int) -> None:
+        self.current = self.metrics[name] = {
+            "instructions": 0, "max_stack_depth": 0, "calls": 0,
+            "strings": 0, "string_instructions": 0}
+        self.depth = 0
+        self.count(0)
+        self.writer.write_function(name, n_locals)
+
+    def write_return(self) -> None:
+        self.count(-1)
+        self.depth = 0
+        self.writer.write_return()
@@ -0,0 +1,193 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import typing
+
+
+class Node:
+    """Base class of every node of the abstract syntax tree. Nodes only hold
+    data; JackParser builds them, the passes in ASTPasses rewrite them, and
+    CodeGenerator lowers them to VM code. Every node declares __slots__ to
+    keep trees of large classes compact.
+    """
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+# Expressions
+
+class Expression(Node):
+    __slots__ = ()
+
+
+class IntConst(Expression):
+    """An integer constant. Folding may produce any 16-bit word, including
+    negative values that cannot appear in the source.
+    """
+    __slots__ = ("value",)
+
+    def __init__(self, value: int) -> None:
+        self.value = value
+
+
+class StringConst(Expression):
+    __slots__ = ("value",)
+
+    def __init__(self, value: str) -> None:
+        self.value = value
+
+
+class KeywordConst(Expression):
+    """One of 'true', 'false', 'null' or 'this'."""
+    __slots__ = ("keyword",)
+
+    def __init__(self, keyword: str) -> None:
+        self.keyword = keyword
+
+
+class VarRef(Expression):
+    __slots__ = ("name",)
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+
+class ArrayRef(Expression):
+    """name[index]"""
+    __slots__ = ("name", "index")
+
+    def __init__(self, name: str, index: Expression) -> None:
+        self.name = name
+        self.index = index
+
+
+class Call(Expression):
+    """A subroutine call: name(arguments) when receiver is None, otherwise
+    receiver.name(arguments), where receiver is a class or variable name.
+    """
+    __slots__ = ("receiver", "name", "arguments")
+
+    def __init__(self, receiver: typing.Optional[str], name: str,
+                 arguments: typing.List[Expression]) -> None:
+        self.receiver = receiver
+        self.name = name
+        self.arguments = arguments
+
+
+class Unary(Expression):
+    """op operand, where op is one of '-', '~', '^', '#'."""
+    __slots__ = ("op", "operand")
+
+    def __init__(self, op: str, operand: Expression) -> None:
+        self.op = op
+        self.operand = operand
+
+
+class Binary(Expression):
+    """left op right. Jack has no operator precedence, so 'a + b * c' is
+    parsed left to right as Binary('*', Binary('+', a, b), c).
+    """
+    __slots__ = ("op", "left", "right")
+
+    def __init__(self, op: str, left: Expression, right: Expression) -> None:
+        self.op = op
+        self.left = left
+        self.right = right
+
+
+# Statements
+
+class Statement(Node):
+    __slots__ = ()
+
+
+class Let(Statement):
+    """let name = value; or let name[index] = value;"""
+    __slots__ = ("name", "index", "value")
+
+    def __init__(self, name: str, index: typing.Optional[Expression],
+                 value: Expression) -> None:
+        self.name = name
+        self.index = index
+        self.value = value
+
+
+class If(Statement):
+    __slots__ = ("condition", "then_statements", "else_statements")
+
+    def __init__(self, condition: Expression,
+                 then_statements: typing.List[Statement],
+                 else_statements: typing.Optional[typing.List[Statement]]) -> None:
+        self.condition = condition
+        self.then_statements = then_statements
+        self.else_statements = else_statements
+
+
+class While(Statement):
+    __slots__ = ("condition", "statements")
+
+    def __init__(self, condition: Expression,
+                 statements: typing.List[Statement]) -> None:
+        self.condition = condition
+        self.statements = statements
+
+
+class Do(Statement):
+    __slots__ = ("call",)
+
+    def __init__(self, call: Call) -> None:
+        self.call = call
+
+
+class Return(Statement):
+    __slots__ = ("value",)
+
+    def __init__(self, value: typing.Optional[Expression]) -> None:
+        self.value = value
+
+
+# Declarations
+
+class VarDec(Node):
+    """A declaration of one or more variables of the same kind and type.
+    kind is 'static', 'field', 'var' or 'argument'.
+    """
+    __slots__ = ("kind", "type", "names")
+
+    def __init__(self, kind: str, type: str, names: typing.List[str]) -> None:
+        self.kind = kind
+        self.type = type
+        self.names = names
+
+
+class Subroutine(Node):
+    """keyword is 'constructor', 'function' or 'method'."""
+    __slots__ = ("keyword", "return_type", "name", "parameters", "locals",
+                 "statements")
+
+    def __init__(self, keyword: str, return_type: str, name: str,
+                 parameters: typing.List[VarDec], locals: typing.List[VarDec],
+                 statements: typing.List[Statement]) -> None:
+        self.keyword = keyword
+        self.return_type = return_type
+        self.name = name
+        self.parameters = parameters
+        self.locals = locals
+        self.statements = statements
+
+
+class Class(Node):
+    __slots__ = ("name", "var_decs", "subroutines")
+
+    def __init__(self, name: str, var_decs: typing.List[VarDec],
+                 subroutines: typing.List[Subroutine]) -> None:
+        self.name = name
+        self.var_decs = var_decs
+        self.subroutines = subroutines
@@ -5,28 +5,559 @@ was written by Aviv Yaish. It is an extension to the specifications given
 as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
 Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
 """
+import argparse
+import collections
+import concurrent.futures
+import contextlib
+import functools
+import io
+import json
 import os
 import sys
+import time
+import tracemalloc
 import typing
+from AsmWriter import AsmWriter, translate
+from ASTPasses import run_passes
+from BuildCache import BuildCache, file_hash
+from CodeGenerator import CodeGenerator
 from CompilationEngine import CompilationEngine
+from CostEstimator import CostEstimator
+from JackParser import JackParser
 from JackTokenizer import JackTokenizer
+from PeepholeOptimizer import PeepholeOptimizer
+from Profiler import PhaseProfiler, ProfiledStream, ProfiledWriter
 from SymbolTable import SymbolTable
+from UnreachableCodeRemover import UnreachableCodeRemover
+from VMBytecode import VMBytecodeWriter
+from VMInterpreter import read_program
+from VMProgram import INLINE_SIZE, VMProgram
 from VMWriter import VMWriter
 
+# In streaming mode the VM output is flushed every this many commands, so
+# that memory use stays flat on the output side as well.
+STREAMING_FLUSH_THRESHOLD = 4096
+# How often --watch looks for changed files, in seconds.
+WATCH_INTERVAL = 0.5
+# How long a changed file must stay unchanged before --watch compiles it, so
+# that an editor saving several times in a row causes a single compilation.
+WATCH_DEBOUNCE = 0.2
+
+
+def make_writer(output_file: typing.TextIO, flush_threshold: int,
+                optimizations: typing.Collection[str], writer=None):
+    """
+    Args:
+        writer: the writer to put the stages in front of, by default a new
+        VMWriter of output_file.
+
+    Returns:
+        a VMWriter for the AST pipeline, behind the writer stages that the
+        given optimizations ask for.
+    """
+    writer = writer or VMWriter(output_file, flush_threshold)
+    if "dce" in optimizations:
+        writer = UnreachableCodeRemover(writer)
+    if "peephole" in optimizations:
+        writer = PeepholeOptimizer(writer)
+    return writer
+
 
 def compile_file(
-        input_file: typing.TextIO, output_file: typing.TextIO) -> None:
+        input_file: typing.TextIO, output_file: typing.TextIO,
+        streaming: bool = False,
+        optimizations: typing.Collection[str] = (),
+        ast: bool = False,
+        metrics_file: typing.Optional[typing.TextIO] = None,
+        binary: bool = False, asm: bool = False, mapped: bool = False) -> None:
     """Compiles a single file.
 
     Args:
         input_file (typing.TextIO): the file to compile.
         output_file (typing.TextIO): writes all output to this file.
+        streaming (bool): tokenize the input lazily, see JackTokenizer.
+        optimizations (typing.Collection[str]): the names of the
+        CompilationEngine.OPTIMIZATIONS to apply.
+        ast (bool): parse the whole class into a tree, run the tree passes
+        over it and only then generate code, instead of writing code while
+        parsing. Both write the same code; the tree is slower but is where
+        whole-class optimizations live. The "dce" optimization always uses
+        the tree.
+        metrics_file (typing.Optional[typing.TextIO]): if given, the cost of
+        every subroutine of the output is written to it as JSON, see
+        CostEstimator.
+        binary (bool): write VM bytecode to output_file, which must then be
+        a binary file, instead of text, see VMBytecodeWriter.
+        asm (bool): write Hack assembly instead of VM code, see AsmWriter.
+        mapped (bool): input_file is a binary file, to memory-map and
+        tokenize as bytes instead of reading it as text, see JackTokenizer.
     """
     # Your code goes here!
     # This function should be relatively similar to "analyze_file" in
     # JackAnalyzer.py from the previous project.
-    tokenizer = JackTokenizer(input_file)
-    compiler = CompilationEngine(tokenizer, output_file)
+    tokenizer = JackTokenizer(input_file, streaming, mapped)
+    flush_threshold = STREAMING_FLUSH_THRESHOLD if streaming else 0
+    writer = None
+    if binary:
+        writer = VMBytecodeWriter(output_file)
+    elif asm:
+        writer = AsmWriter(output_file, flush_threshold)
+    if metrics_file is not None:
+        writer = CostEstimator(writer or VMWriter(output_file, flush_threshold))
+    if not ast and "dce" not in optimizations:
+        compiler = CompilationEngine(
+            tokenizer, output_file, flush_threshold, optimizations, writer)
+    else:
+        tree = JackParser(tokenizer).parse_class()
+        run_passes(tree, optimizations)
+        CodeGenerator(make_writer(output_file, flush_threshold, optimizations, writer),
+                      optimizations).generate(tree)
+    if metrics_file is not None:
+        json.dump(writer.metrics, metrics_file, indent=1)
+        metrics_file.write("\n")
+
+
+def compile_profiled(
+        input_file: typing.TextIO, output_file: typing.TextIO,
+        profiler: PhaseProfiler, streaming: bool = False,
+        optimizations: typing.Collection[str] = (),
+        ast: bool = False) -> typing.Dict[str, int]:
+    """Compiles a single file like compile_file does, as a sequence of
+    phases measured by profiler: "read", "tokenize", then "compile" (parsing
+    and code generation, which are interleaved) or, in the AST pipeline,
+    "parse", "passes" and "generate", and "emit", the VMWriter formatting
+    the commands and writing them to output_file. The writer stages, like
+    the peephole optimizer, count as code generation. In streaming mode
+    tokens are read while compiling, so "tokenize" only covers setting up the
+    tokenizer.
+
+    Returns:
+        typing.Dict[str, int]: the number of tokens, VM commands and symbols.
+    """
+    text = profiler.run("read", input_file.read)
+    tokenizer = profiler.run("tokenize", JackTokenizer, io.StringIO(text), streaming)
+    output = ProfiledStream(output_file, profiler)
+    flush_threshold = STREAMING_FLUSH_THRESHOLD if streaming else 0
+    writer = ProfiledWriter(VMWriter(output, flush_threshold), profiler)
+    if not ast and "dce" not in optimizations:
+        compiler = profiler.run("compile", CompilationEngine, tokenizer, output,
+                                flush_threshold, optimizations, writer)
+        symbol_table = compiler.symbol_table
+    else:
+        tree = profiler.run("parse", JackParser(tokenizer).parse_class)
+        profiler.run("passes", run_passes, tree, optimizations)
+        generator = CodeGenerator(make_writer(output, flush_threshold, optimizations, writer),
+                                  optimizations)
+        profiler.run("generate", generator.generate, tree)
+        symbol_table = generator.symbol_table
+    if streaming:
+        # token_i is the index of the current token, "" past the last one.
+        token_count = tokenizer.token_i + (tokenizer.current_token != "")
+    else:
+        token_count = len(tokenizer.tokens)
+    return {"tokens": token_count,
+            "vm_commands": output.lines,
+            "symbols": symbol_table.defined}
+
+
+def profile_path(input_path: str, **options) -> typing.Dict:
+    """Compiles the .jack file at input_path into a .vm file next to it,
+    and profiles the compilation. Phase times come from this compilation;
+    allocations come from a second one into memory with tracemalloc tracing,
+    which would distort the times.
+
+    Args:
+        input_path (str): path of the .jack file to compile.
+        options: keyword arguments passed on to compile_profiled.
+
+    Returns:
+        typing.Dict: the "phases" and the counts, see compile_profiled.
+    """
+    timed = PhaseProfiler()
+    output_path = vm_path(input_path)
+    try:
+        with open(input_path, 'r') as input_file, \
+                open(output_path, 'w') as output_file:
+            counts = compile_profiled(input_file, output_file, timed, **options)
+    except BaseException:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+    traced = PhaseProfiler()
+    tracemalloc.start()
+    try:
+        with open(input_path, 'r') as input_file:
+            compile_profiled(input_file, io.StringIO(), traced, **options)
+    finally:
+        tracemalloc.stop()
+    return dict(phases=PhaseProfiler.merge(timed.phases, traced.phases), **counts)
+
+
+def profile_paths(input_paths: typing.List[str],
+                  **options) -> typing.Tuple[typing.Dict[str, str], typing.Dict]:
+    """Compiles and profiles every file in input_paths, one at a time.
+
+    Args:
+        input_paths (typing.List[str]): paths of the .jack files to compile.
+        options: keyword arguments passed on to compile_profiled.
+
+    Returns:
+        typing.Tuple[typing.Dict[str, str], typing.Dict]: an error message for
+        every file that failed, and the report: the profile of every file
+        that compiled, and their "total".
+    """
+    errors = {}
+    files = {}
+    total = {"phases": {}, "tokens": 0, "vm_commands": 0, "symbols": 0}
+    for input_path in input_paths:
+        try:
+            profile = profile_path(input_path, **options)
+        except Exception as error:
+            errors[input_path] = f"{type(error).__name__}: {error}"
+            continue
+        files[input_path] = profile
+        for phase, entry in profile["phases"].items():
+            total_entry = total["phases"].setdefault(
+                phase, {"seconds": 0.0, "allocated_bytes": 0, "peak_bytes": 0})
+            total_entry["seconds"] += entry["seconds"]
+            total_entry["allocated_bytes"] += entry["allocated_bytes"]
+            total_entry["peak_bytes"] = max(total_entry["peak_bytes"], entry["peak_bytes"])
+        for count in ("tokens", "vm_commands", "symbols"):
+            total[count] += profile[count]
+    return errors, {"settings": options, "files": files, "total": total}
+
+
+def vm_path(input_path: str, binary: bool = False) -> str:
+    """
+    Args:
+        input_path (str): path of a .jack file.
+        binary (bool): whether it compiles to VM bytecode.
+
+    Returns:
+        str: the path of the .vm file, or .vmb bytecode file, it compiles to.
+    """
+    return os.path.splitext(input_path)[0] + (".vmb" if binary else ".vm")
+
+
+def metrics_path(input_path: str) -> str:
+    """
+    Args:
+        input_path (str): path of a .jack file.
+
+    Returns:
+        str: the path of the metrics report written next to its .vm file.
+    """
+    return os.path.splitext(input_path)[0] + ".metrics.json"
+
+
+def jack_files(argument_path: str) -> typing.List[str]:
+    """
+    Args:
+        argument_path (str): a .jack file, or a directory of .jack files.
+
+    Returns:
+        typing.List[str]: the .jack files to compile, in name order.
+    """
+    if os.path.isdir(argument_path):
+        input_paths = [os.path.join(argument_path, filename)
+                       for filename in sorted(os.listdir(argument_path))]
+    else:
+        input_paths = [argument_path]
+    return [input_path for input_path in input_paths
+            if os.path.splitext(input_path)[1].lower() == ".jack"]
+
+
+def file_states(input_paths: typing.Iterable[str]) -> typing.Dict[str, typing.Tuple[int, int]]:
+    """
+    Args:
+        input_paths (typing.Iterable[str]): paths of files.
+
+    Returns:
+        typing.Dict[str, typing.Tuple[int, int]]: the modification time and
+        size of every file that exists.
+    """
+    states = {}
+    for input_path in input_paths:
+        try:
+            status = os.stat(input_path)
+        except FileNotFoundError:
+            continue
+        states[input_path] = (status.st_mtime_ns, status.st_size)
+    return states
+
+
+def compile_path(input_path: str, metrics: bool = False, **options) -> str:
+    """Compiles the .jack file at input_path into a .vm file (or with the
+    binary option, a .vmb file) next to it. If compilation fails, no partial
+    output is left behind.
+
+    Args:
+        input_path (str): path of the .jack file to compile.
+        metrics (bool): also write a metrics report next to the .vm file,
+        see metrics_path.
+        options: keyword arguments passed on to compile_file.
+
+    Returns:
+        str: the path of the written output file.
+    """
+    binary = options.get("binary", False)
+    output_path = vm_path(input_path, binary)
+    report_path = metrics_path(input_path)
+    try:
+        with open(input_path, 'rb' if options.get("mapped") else 'r') as input_file, \
+                open(output_path, 'wb' if binary else 'w') as output_file:
+            if metrics:
+                with open(report_path, 'w') as metrics_file:
+                    compile_file(input_file, output_file,
+                                 metrics_file=metrics_file, **options)
+            else:
+                compile_file(input_file, output_file, **options)
+    except BaseException:
+        for path in (output_path, report_path):
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    return output_path
+
+
+def compile_paths(input_paths: typing.List[str], jobs: int = 1,
+                  **options) -> typing.Dict[str, str]:
+    """Compiles every file in input_paths, each into its own .vm file. A file
+    that fails to compile does not stop the others.
+
+    Args:
+        input_paths (typing.List[str]): paths of the .jack files to compile.
+        jobs (int): number of worker processes; 1 compiles in this process.
+        options: keyword arguments passed on to compile_file.
+
+    Returns:
+        typing.Dict[str, str]: an error message for every file that failed.
+    """
+    errors = {}
+    if jobs == 1:
+        for input_path in input_paths:
+            try:
+                compile_path(input_path, **options)
+            except Exception as error:
+                errors[input_path] = f"{type(error).__name__}: {error}"
+        return errors
+
+    with concurrent.futures.ProcessPoolExecutor(jobs) as executor:
+        futures = {executor.submit(compile_path, input_path, **options): input_path
+                   for input_path in input_paths}
+        for future in concurrent.futures.as_completed(futures):
+            error = future.exception()
+            if error is not None:
+                errors[futures[future]] = f"{type(error).__name__}: {error}"
+    return errors
+
+
+def compile_to_text(input_path: str, **options) -> str:
+    """
+    Args:
+        input_path (str): path of the .jack file to compile. With the asm
+        option, it may also be a .vm file to translate, e.g. of the OS.
+        options: keyword arguments passed on to compile_file.
+
+    Returns:
+        str: its VM code, or Hack assembly with the asm option.
+    """
+    output = io.StringIO()
+    if input_path.endswith(".vm") and options.get("asm"):
+        writer = AsmWriter(output)
+        translate(read_program(input_path), writer)
+        writer.flush()
+        return output.getvalue()
+    with open(input_path, 'rb' if options.get("mapped") else 'r') as input_file:
+        compile_file(input_file, output, **options)
+    return output.getvalue()
+
+
+def link_index_path(output_path: str) -> str:
+    """
+    Args:
+        output_path (str): path of a linked .vm file.
+
+    Returns:
+        str: the path of its index of function offsets.
+    """
+    return os.path.splitext(output_path)[0] + ".index.json"
+
+
+def submit_in_order(executor: concurrent.futures.Executor, function: typing.Callable,
+                    input_paths: typing.List[str], window: int,
+                    **options) -> typing.Iterator[typing.Callable[[], typing.Any]]:
+    """Submits function on every path to executor, keeping at most window
+    calls submitted but not yet consumed, so that the results waiting to be
+    consumed do not pile up when they are consumed slower than computed.
+
+    Returns:
+        typing.Iterator[typing.Callable[[], typing.Any]]: for every path, in
+        order, a callable that waits for its result and returns it.
+    """
+    pending = collections.deque()
+    for input_path in input_paths:
+        pending.append(executor.submit(function, input_path, **options))
+        if len(pending) >= window:
+            yield pending.popleft().result
+    while pending:
+        yield pending.popleft().result
+
+
+def link_paths(input_paths: typing.List[str], output_path: str,
+               index: bool = False, jobs: int = 1, prelude: str = "",
+               **options) -> typing.Dict[str, str]:
+    """Compiles every file in input_paths into a single .vm file, one class
+    after the other in the order given, instead of a .vm file per class.
+    Classes are written as they are compiled, so only one is held in memory
+    at a time, or with several jobs, at most two per worker. If any file
+    fails to compile, no output is left behind.
+
+    Args:
+        input_paths (typing.List[str]): paths of the .jack files to compile.
+        output_path (str): the linked .vm file to write.
+        index (bool): also write where every class and function starts in
+        the output to a JSON file, see link_index_path. Offsets are in
+        bytes, lines count from 0.
+        jobs (int): number of worker processes; 1 compiles in this process.
+        prelude (str): text to write before the first class, e.g. the
+        bootstrap code of an assembly program.
+        options: keyword arguments passed on to compile_to_text.
+
+    Returns:
+        typing.Dict[str, str]: an error message for every file that failed.
+    """
+    errors = {}
+    classes = {}
+    functions = {}
+    offset = len(prelude.encode())
+    line = prelude.count("\n")
+    executor = None
+    if jobs == 1:
+        results = [functools.partial(compile_to_text, input_path, **options)
+                   for input_path in input_paths]
+    else:
+        executor = concurrent.futures.ProcessPoolExecutor(jobs)
+        results = submit_in_order(executor, compile_to_text, input_paths,
+                                  2 * jobs, **options)
+    try:
+        # Without newline translation, so that the offsets are exact.
+        with open(output_path, 'w', newline='\n') as output_file:
+            output_file.write(prelude)
+            for input_path, result in zip(input_paths, results):
+                try:
+                    text = result()
+                except Exception as error:
+                    errors[input_path] = f"{type(error).__name__}: {error}"
+                    continue
+                if errors:
+                    # The output is discarded, but the remaining files are
+                    # still compiled to report their errors too.
+                    continue
+                output_file.write(text)
+                if not index:
+                    continue
+                class_name = os.path.splitext(os.path.basename(input_path))[0]
+                classes[class_name] = {"offset": offset, "line": line}
+                for code_line in text.splitlines(True):
+                    if code_line.startswith("function "):
+                        functions[code_line.split()[1]] = {"offset": offset, "line": line}
+                    offset += len(code_line.encode())
+                    line += 1
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    if errors:
+        os.remove(output_path)
+    elif index:
+        with open(link_index_path(output_path), 'w') as index_file:
+            json.dump({"classes": classes, "functions": functions}, index_file, indent=1)
+            index_file.write("\n")
+    return errors
+
+
+def watch(argument_path: str, interval: float = WATCH_INTERVAL,
+          debounce: float = WATCH_DEBOUNCE, **options) -> None:
+    """Compiles every .jack file of argument_path, then keeps polling them
+    and recompiles only the files that were added or changed, rewriting
+    just their .vm files. The result of every compilation is printed to
+    standard output as it happens, with the time it took. Runs until
+    interrupted.
+
+    Args:
+        argument_path (str): a .jack file, or a directory of .jack files.
+        interval (float): seconds between polls.
+        debounce (float): seconds a changed file must stay unchanged before
+        it is compiled.
+        options: keyword arguments passed on to compile_path.
+    """
+    compiled = {}
+    while True:
+        states = file_states(jack_files(argument_path))
+        changed = [input_path for input_path, state in states.items()
+                   if compiled.get(input_path) != state]
+        if changed:
+            time.sleep(debounce)
+            settled = file_states(changed)
+            # Files still being written are left for a later poll.
+            changed = [input_path for input_path in changed
+                       if settled.get(input_path) == states[input_path]]
+        for input_path in changed:
+            start = time.perf_counter()
+            try:
+                compile_path(input_path, **options)
+                result = "ok"
+            except Exception as error:
+                result = f"{type(error).__name__}: {error}"
+            # A file that failed is not retried until it changes again.
+            compiled[input_path] = states[input_path]
+            print(f"{input_path}: {result} "
+                  f"({(time.perf_counter() - start) * 1000:.1f} ms)", flush=True)
+        for input_path in set(compiled) - set(states):
+            del compiled[input_path]
+            print(f"{input_path}: removed", flush=True)
+        time.sleep(interval)
+
+
+def optimize_program(input_paths: typing.List[str], prune: bool = False,
+                     inline_size: int = 0) -> typing.List[str]:
+    """Applies the whole-program optimizations of VMProgram to the compiled
+    .vm files of every class of a program, in place.
+
+    Args:
+        input_paths (typing.List[str]): paths of the .jack files of every
+        class of the program, all already compiled.
+        prune (bool): remove the subroutines that cannot be reached from
+        Main.main or Sys.init.
+        inline_size (int): if positive, inline calls to functions of up to
+        this many commands.
+
+    Returns:
+        typing.List[str]: a report of what was changed, one line each.
+    """
+    program = VMProgram()
+    for input_path in input_paths:
+        with open(vm_path(input_path), 'r') as vm_file:
+            program.add_class(os.path.splitext(os.path.basename(input_path))[0],
+                              vm_file.read())
+    report = []
+    if inline_size > 0:
+        report.append(f"Inlined {program.inline(inline_size)} calls")
+    if prune and not program.reachable():
+        report.append("Nothing pruned: neither Main.main nor Sys.init was compiled")
+    elif prune:
+        function_count = len(program.functions)
+        command_count = program.command_count()
+        removed = program.prune()
+        report.append(f"Pruned {len(removed)} of {function_count} subroutines, "
+                      f"{command_count - program.command_count()} of "
+                      f"{command_count} VM commands")
+        report.extend(f"  {name}" for name in removed)
+    for input_path in input_paths:
+        with open(vm_path(input_path), 'w') as vm_file:
+            vm_file.write(program.class_code(
+                os.path.splitext(os.path.basename(input_path))[0]))
+    return report
 
 
 if "__main__" == __name__:
@@ -35,20 +566,210 @@ if "__main__" == __name__:
     # Both are closed automatically when the code finishes running.
     # If the output file does not exist, it is created automatically in the
     # correct path, using the correct filename.
-    if not len(sys.argv) == 2:
-        sys.exit("Invalid usage, please use: JackCompiler <input path>")
-    argument_path = os.path.abspath(sys.argv[1])
+    parser = argparse.ArgumentParser(
+        prog="JackCompiler", description="Compiles Jack files into VM code.")
+    parser.add_argument("input_path",
+                        help="a .jack file, or a directory of .jack files")
+    parser.add_argument("--stream", action="store_true",
+                        help="tokenize lazily, keeping memory use flat on "
+                             "very large sources")
+    parser.add_argument("--mmap", action="store_true",
+                        help="memory-map each source and tokenize its bytes "
+                             "instead of reading it as text, which takes less "
+                             "memory and time on very large sources")
+    parser.add_argument("-j", "--jobs", type=int, default=1, metavar="N",
+                        help="compile N files in parallel (0 uses every CPU)")
+    parser.add_argument("-O", "--optimize", action="append", default=[],
+                        choices=CompilationEngine.OPTIMIZATIONS + ("all",),
+                        metavar="NAME",
+                        help="enable an optimization, may be repeated: "
+                             f"{', '.join(CompilationEngine.OPTIMIZATIONS)}, "
+                             "or all")
+    parser.add_argument("--ast", action="store_true",
+                        help="compile through an abstract syntax tree "
+                             "instead of in a single pass")
+    parser.add_argument("--prune", action="store_true",
+                        help="leave out the subroutines that Main.main and "
+                             "Sys.init never call, and report them")
+    parser.add_argument("--inline", action="store_true",
+                        help="replace calls to small straight-line functions, "
+                             "such as getters and setters, by their code")
+    parser.add_argument("--inline-size", type=int, default=INLINE_SIZE,
+                        metavar="N",
+                        help="the largest function --inline inlines, in VM "
+                             f"commands (default {INLINE_SIZE})")
+    parser.add_argument("--profile", metavar="FILE",
+                        help="write a JSON report of the time and memory "
+                             "each compilation phase takes to FILE ('-' for "
+                             "standard output); compiles every file, one at "
+                             "a time")
+    parser.add_argument("--metrics", action="store_true",
+                        help="also write the instruction count, stack depth, "
+                             "calls and string cost of every subroutine to a "
+                             ".metrics.json file next to each .vm file")
+    parser.add_argument("--binary", action="store_true",
+                        help="write compact VM bytecode to a .vmb file per "
+                             "class instead of text .vm files, see "
+                             "VMBytecode.py")
+    parser.add_argument("--link", metavar="FILE",
+                        help="write every compiled class, in name order, to "
+                             "the single .vm file FILE instead of a .vm file "
+                             "per class")
+    parser.add_argument("--link-index", action="store_true",
+                        help="with --link, also write the offset of every "
+                             "class and function in FILE to a .index.json "
+                             "file next to it")
+    parser.add_argument("--asm", metavar="FILE",
+                        help="translate the whole program straight to Hack "
+                             "assembly in FILE, including any .vm file without "
+                             "a .jack source, such as the OS")
+    parser.add_argument("--watch", action="store_true",
+                        help="after compiling, keep watching the input path "
+                             "and recompile each .jack file that changes, "
+                             "printing every result with its time")
+    parser.add_argument("--watch-interval", type=float, default=WATCH_INTERVAL,
+                        metavar="SECONDS",
+                        help="how often --watch looks for changes (default "
+                             f"{WATCH_INTERVAL})")
+    parser.add_argument("--force", action="store_true",
+                        help="recompile every file, even if it is up to date")
+    parser.add_argument("--clean-cache", action="store_true",
+                        help="delete the build cache of the input path and exit")
+    args = parser.parse_args()
+    if args.metrics and args.profile:
+        parser.error("--metrics cannot be combined with --profile")
+    if args.mmap and (args.stream or args.profile):
+        parser.error("--mmap cannot be combined with --stream or --profile")
+    if args.asm and (args.prune or args.inline or args.profile or args.metrics
+                     or args.binary or args.link or args.watch):
+        parser.error("--asm cannot be combined with --prune, --inline, "
+                     "--profile, --metrics, --binary, --link or --watch")
+    if args.binary and (args.prune or args.inline or args.profile or args.link):
+        parser.error("--binary cannot be combined with --prune, --inline, "
+                     "--profile or --link")
+    if args.link and (args.prune or args.inline or args.profile or
+                      args.metrics or args.watch):
+        parser.error("--link cannot be combined with --prune, --inline, "
+                     "--profile, --metrics or --watch")
+    if args.link_index and not args.link:
+        parser.error("--link-index requires --link")
+    if args.watch and (args.prune or args.inline or args.profile):
+        parser.error("--watch cannot be combined with --prune, --inline or "
+                     "--profile")
+    argument_path = os.path.abspath(args.input_path)
     if os.path.isdir(argument_path):
-        files_to_assemble = [
-            os.path.join(argument_path, filename)
-            for filename in os.listdir(argument_path)]
-    else:
-        files_to_assemble = [argument_path]
-    for input_path in files_to_assemble:
-        filename, extension = os.path.splitext(input_path)
-        if extension.lower() != ".jack":
-            continue
-        output_path = filename + ".vm"
-        with open(input_path, 'r') as input_file, \
-                open(output_path, 'w') as output_file:
-            compile_file(input_file, output_file)
+        output_directory = argument_path
+    else:
+        output_directory = os.path.dirname(argument_path)
+    files_to_assemble = jack_files(argument_path)
+    jobs = args.jobs or os.cpu_count()
+    optimizations = sorted(
+        CompilationEngine.OPTIMIZATIONS if "all" in args.optimize
+        else set(args.optimize))
+    options = {"streaming": args.stream, "optimizations": optimizations,
+               "ast": args.ast}
+    if args.metrics:
+        options["metrics"] = True
+    if args.binary:
+        options["binary"] = True
+    if args.mmap:
+        options["mapped"] = True
+
+    # Classes whose source, compiler, options and output are unchanged since
+    # the last build are skipped, see BuildCache.
+    cache = BuildCache(output_directory, {"optimizations": optimizations,
+                                           "ast": args.ast,
+                                           "metrics": args.metrics,
+                                           "binary": args.binary})
+    if args.clean_cache:
+        cache.clean()
+        sys.exit()
+    if args.asm:
+        # Like --link, with the bootstrap code first.
+        vm_files = [os.path.join(output_directory, filename)
+                    for filename in sorted(os.listdir(output_directory))
+                    if filename.endswith(".vm") and
+                    os.path.join(output_directory, filename[:-3] + ".jack")
+                    not in files_to_assemble] if os.path.isdir(argument_path) else []
+        class_names = {os.path.splitext(os.path.basename(input_path))[0]
+                       for input_path in files_to_assemble + vm_files}
+        bootstrap = io.StringIO()
+        bootstrap_writer = AsmWriter(bootstrap)
+        bootstrap_writer.write_bootstrap("Sys.init" if "Sys" in class_names else "Main.main")
+        bootstrap_writer.flush()
+        errors = link_paths(files_to_assemble + vm_files, os.path.abspath(args.asm),
+                            jobs=jobs, prelude=bootstrap.getvalue(), asm=True,
+                            **options)
+        for input_path, message in sorted(errors.items()):
+            print(f"{input_path}: {message}", file=sys.stderr)
+        sys.exit(1 if errors else 0)
+    if args.link:
+        # The linked file is always written whole, so the cache, which
+        # tracks a .vm file per class, is not used.
+        start = time.perf_counter()
+        errors = link_paths(files_to_assemble, os.path.abspath(args.link),
+                            args.link_index, jobs, **options)
+        for input_path, message in sorted(errors.items()):
+            print(f"{input_path}: {message}", file=sys.stderr)
+        if jobs > 1:
+            print(f"Linked {len(files_to_assemble)} files with {jobs} workers "
+                  f"in {time.perf_counter() - start:.3f}s", file=sys.stderr)
+        sys.exit(1 if errors else 0)
+    if args.watch:
+        # Every file is compiled once, so the cache is not needed; its
+        # entries are checked against the .vm files and stay safe to use.
+        try:
+            watch(argument_path, args.watch_interval, **options)
+        except KeyboardInterrupt:
+            pass
+        sys.exit()
+    whole_program = args.prune or args.inline
+    if whole_program:
+        # The code of each class depends on every other class, so the whole
+        # program is compiled and the cache is neither used nor updated.
+        stale_files = files_to_assemble
+    else:
+        source_hashes = {input_path: file_hash(input_path)
+                         for input_path in files_to_assemble}
+        stale_files = [
+            input_path for input_path in files_to_assemble
+            if args.force or args.profile or not cache.is_fresh(
+                input_path, vm_path(input_path, args.binary),
+                source_hashes[input_path],
+                metrics_path(input_path) if args.metrics else None)]
+
+    start = time.perf_counter()
+    if args.profile:
+        errors, profile = profile_paths(stale_files, **options)
+        with (contextlib.nullcontext(sys.stdout) if args.profile == "-"
+              else open(args.profile, 'w')) as report:
+            json.dump(profile, report, indent=1)
+            report.write("\n")
+    else:
+        errors = compile_paths(stale_files, jobs, **options)
+    elapsed = time.perf_counter() - start
+
+    if whole_program:
+        if not errors:
+            for line in optimize_program(files_to_assemble, args.prune,
+                                         args.inline_size if args.inline else 0):
+                print(line, file=sys.stderr)
+    else:
+        for input_path in stale_files:
+            if input_path in errors:
+                cache.discard(input_path)
+            else:
+                cache.update(input_path, vm_path(input_path, args.binary),
+                             source_hashes[input_path],
+                             metrics_path(input_path) if args.metrics else None)
+        cache.save()
+
+    for input_path, message in sorted(errors.items()):
+        print(f"{input_path}: {message}", file=sys.stderr)
+    if jobs > 1:
+        print(f"Compiled {len(stale_files) - len(errors)} of "
+              f"{len(stale_files)} files with {jobs} workers in "
+              f"{elapsed:.3f}s, {len(files_to_assemble) - len(stale_files)} "
+              f"up to date", file=sys.stderr)
+    if errors:
+        sys.exit(1)
@@ -0,0 +1,264 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import typing
+from JackAST import (ArrayRef, Binary, Call, Class, Do, Expression, If,
+                     IntConst, KeywordConst, Let, Return, Statement,
+                     StringConst, Subroutine, Unary, VarDec, VarRef, While)
+from JackTokenizer import JackTokenizer
+
+
+class JackParser:
+    """Gets input from a JackTokenizer and builds the abstract syntax tree of
+    the class it holds, following the Jack grammar (see JackTokenizer). Unlike
+    CompilationEngine, nothing is written while parsing, so the whole class
+    can be analysed and rewritten before code is generated.
+    """
+    OP = frozenset(['+', '-', '*', '/', '&', '|', '<', '>', '='])
+    UNARY_OP = frozenset(['-', '~', '^', '#'])
+    KEYWORD_CONSTANT = frozenset(['true', 'false', 'null', 'this'])
+    STATEMENTS = frozenset(['let', 'if', 'while', 'do', 'return'])
+
+    def __init__(self, input_stream: JackTokenizer) -> None:
+        """
+        Args:
+            input_stream (JackTokenizer): the tokens to parse.
+        """
+        self.input_stream = input_stream
+        self.input_stream.advance()
+
+    def take(self) -> str:
+        """Returns the current token and advances past it."""
+        token = self.input_stream.current_token
+        self.input_stream.advance()
+        return token
+
+    def expect(self, token: str) -> None:
+        """Advances past the current token, which must be the given one.
+
+        Raises:
+            ValueError: if the current token is a different one.
+        """
+        if self.input_stream.current_token != token:
+            raise ValueError(f"Expected {token!r} but found "
+                             f"{self.input_stream.current_token!r} in class {self.class_name}")
+        self.input_stream.advance()
+
+    def at_symbol(self, symbol: str) -> bool:
+        return self.input_stream.token_type() == "SYMBOL" and \
+            self.input_stream.symbol() == symbol
+
+    def at_keyword(self, keywords: typing.Collection[str]) -> bool:
+        return self.input_stream.token_type() == "KEYWORD" and \
+            self.input_stream.keyword() in keywords
+
+    def parse_class(self) -> Class:
+        """class: 'class' className '{' classVarDec* subroutineDec* '}'"""
+        self.class_name = ""
+        self.expect('class')
+        self.class_name = self.take()
+        self.expect('{')
+        var_decs = []
+        while self.at_keyword(['static', 'field']):
+            var_decs.append(self.parse_var_dec())
+        subroutines = []
+        while self.at_keyword(['constructor', 'function', 'method']):
+            subroutines.append(self.parse_subroutine())
+        self.expect('}')
+        return Class(self.class_name, var_decs, subroutines)
+
+    def parse_var_dec(self) -> VarDec:
+        """classVarDec: ('static' | 'field') type varName (',' varName)* ';'
+        varDec: 'var' type varName (',' varName)* ';'
+        """
+        kind = self.take()
+        var_type = self.take()
+        names = [self.take()]
+        while self.at_symbol(','):
+            self.input_stream.advance()
+            names.append(self.take())
+        self.expect(';')
+        return VarDec(kind, var_type, names)
+
+    def parse_subroutine(self) -> Subroutine:
+        """subroutineDec: ('constructor' | 'function' | 'method') ('void' | type)
+        subroutineName '(' parameterList ')' subroutineBody
+        """
+        keyword = self.take()
+        return_type = self.take()
+        name = self.take()
+        self.expect('(')
+        parameters = self.parse_parameter_list()
+        self.expect(')')
+        self.expect('{')
+        local_decs = []
+        while self.at_keyword(['var']):
+            local_decs.append(self.parse_var_dec())
+        statements = self.parse_statements()
+        self.expect('}')
+        return Subroutine(keyword, return_type, name, parameters, local_decs, statements)
+
+    def parse_parameter_list(self) -> typing.List[VarDec]:
+        """parameterList: ((type varName) (',' type varName)*)?"""
+        parameters = []
+        if not self.at_symbol(')'):
+            parameters.append(VarDec("argument", self.take(), [self.take()]))
+            while self.at_symbol(','):
+                self.input_stream.advance()
+                parameters.append(VarDec("argument", self.take(), [self.take()]))
+        return parameters
+
+    def parse_statements(self) -> typing.List[Statement]:
+        """statements: statement*"""
+        statements = []
+        while self.at_keyword(JackParser.STATEMENTS):
+            statement = self.input_stream.keyword()
+            if statement == "let":
+                statements.append(self.parse_let())
+            elif statement == "if":
+                statements.append(self.parse_if())
+            elif statement == "while":
+                statements.append(self.parse_while())
+            elif statement == "do":
+                statements.append(self.parse_do())
+            else:
+                statements.append(self.parse_return())
+        return statements
+
+    def parse_let(self) -> Let:
+        """letStatement: 'let' varName ('[' expression ']')? '=' expression ';'"""
+        self.expect('let')
+        name = self.take()
+        index = None
+        if self.at_symbol('['):
+            self.input_stream.advance()
+            index = self.parse_expression()
+            self.expect(']')
+        self.expect('=')
+        value = self.parse_expression()
+        self.expect(';')
+        return Let(name, index, value)
+
+    def parse_if(self) -> If:
+        """ifStatement: 'if' '(' expression ')' '{' statements '}' ('else' '{'
+        statements '}')?
+        """
+        self.expect('if')
+        self.expect('(')
+        condition = self.parse_expression()
+        self.expect(')')
+        self.expect('{')
+        then_statements = self.parse_statements()
+        self.expect('}')
+        else_statements = None
+        if self.at_keyword(['else']):
+            self.input_stream.advance()
+            self.expect('{')
+            else_statements = self.parse_statements()
+            self.expect('}')
+        return If(condition, then_statements, else_statements)
+
+    def parse_while(self) -> While:
+        """whileStatement: 'while' '(' expression ')' '{' statements '}'"""
+        self.expect('while')
+        self.expect('(')
+        condition = self.parse_expression()
+        self.expect(')')
+        self.expect('{')
+        statements = self.parse_statements()
+        self.expect('}')
+        return While(condition, statements)
+
+    def parse_do(self) -> Do:
+        """doStatement: 'do' subroutineCall ';'"""
+        self.expect('do')
+        call = self.parse_call(self.take())
+        self.expect(';')
+        return Do(call)
+
+    def parse_return(self) -> Return:
+        """returnStatement: 'return' expression? ';'"""
+        self.expect('return')
+        value = None
+        if not self.at_symbol(';'):
+            value = self.parse_expression()
+        self.expect(';')
+        return Return(value)
+
+    def parse_expression(self) -> Expression:
+        """expression: term (op term)*"""
+        expression = self.parse_term()
+        while self.input_stream.token_type() == "SYMBOL" and \
+                self.input_stream.symbol() in JackParser.OP:
+            op = self.take()
+            expression = Binary(op, expression, self.parse_term())
+        return expression
+
+    def parse_term(self) -> Expression:
+        """term: integerConstant | stringConstant | keywordConstant | varName |
+        varName '['expression']' | subroutineCall | '(' expression ')' |
+        unaryOp term
+        """
+        token_type = self.input_stream.token_type()
+        if token_type == "INT_CONST":
+            term = IntConst(self.input_stream.int_val())
+            self.input_stream.advance()
+        elif token_type == "STRING_CONST":
+            term = StringConst(self.input_stream.string_val())
+            self.input_stream.advance()
+        elif self.at_keyword(JackParser.KEYWORD_CONSTANT):
+            term = KeywordConst(self.take())
+        elif token_type == "IDENTIFIER":
+            name = self.take()
+            if self.at_symbol('['):
+                self.input_stream.advance()
+                term = ArrayRef(name, self.parse_expression())
+                self.expect(']')
+            elif self.at_symbol('(') or self.at_symbol('.'):
+                term = self.parse_call(name)
+            else:
+                term = VarRef(name)
+        elif self.at_symbol('('):
+            self.input_stream.advance()
+            term = self.parse_expression()
+            self.expect(')')
+        elif token_type == "SYMBOL" and self.input_stream.symbol() in JackParser.UNARY_OP:
+            op = self.take()
+            term = Unary(op, self.parse_term())
+        else:
+            raise ValueError(f"Unexpected {self.input_stream.current_token!r} "
+                             f"in an expression in class {self.class_name}")
+        return term
+
+    def parse_call(self, first_name: str) -> Call:
+        """subroutineCall: subroutineName '(' expressionList ')' | (className |
+        varName) '.' subroutineName '(' expressionList ')'
+
+        Args:
+            first_name (str): the identifier the call starts with, which was
+            already taken.
+        """
+        receiver = None
+        name = first_name
+        if self.at_symbol('.'):
+            self.input_stream.advance()
+            receiver = first_name
+            name = self.take()
+        self.expect('(')
+        arguments = self.parse_expression_list()
+        self.expect(')')
+        return Call(receiver, name, arguments)
+
+    def parse_expression_list(self) -> typing.List[Expression]:
+        """expressionList: (expression (',' expression)* )?"""
+        arguments = []
+        if not self.at_symbol(')'):
+            arguments.append(self.parse_expression())
+            while self.at_symbol(','):
+                self.input_stream.advance()
+                arguments.append(self.parse_expression())
+        return arguments
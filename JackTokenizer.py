@@ -5,9 +5,167 @@ was written by Aviv Yaish. It is an extension to the specifications given
 as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
 Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
 """
+import array
+import mmap
+import operator
 import typing
 import re
 
+KEYWORDS = frozenset(['class', 'constructor', 'function', 'method', 'field', 'static', 'var', 'int', 'char', 'boolean',
+                      'void', 'true', 'false', 'null', 'this', 'let', 'do', 'if', 'else', 'while', 'return'])
+
+# Token types are stored as small integer codes, TOKEN_TYPES maps them back to
+# the names token_type() returns.
+TOKEN_TYPES = ("KEYWORD", "SYMBOL", "IDENTIFIER", "INT_CONST", "STRING_CONST")
+KEYWORD, SYMBOL, IDENTIFIER, INT_CONST, STRING_CONST = range(len(TOKEN_TYPES))
+
+# One master pattern for the whole lexical grammar. Every match skips the
+# whitespace and comments in front of a single token, so the text is scanned
+# once, left to right, with one match per token. The name of the group that
+# matched classifies the token. Alternatives are tried in order, so comments
+# win over the '/' symbol, and a stray character falls through to the "error"
+# group instead of being skipped.
+TOKEN_REGEX = re.compile(r"""
+    (?:
+        \s+                            # whitespace
+      | //[^\n]*                       # comment until the line's end
+      | /\*.*?\*/                      # /* comment */ and /** API comment */
+    )*
+    (?:
+        (?P<string>"[^"\n]*")          # stringConstant
+      | (?P<int>\d+)                   # integerConstant
+      | (?P<word>[^\W\d]\w*)           # keyword or identifier
+      | (?P<symbol>                    # symbol
+            [{}()\[\].,;+\-*&|<>=~^\#]
+          | /(?!\*)                    # '/', unless it opens a comment
+        )
+      | (?P<error>\S)
+      | \Z                             # trailing whitespace and comments
+    )
+""", re.VERBOSE | re.DOTALL)
+
+# Token type of each regex group, except "word", which is a keyword or an
+# identifier depending on KEYWORDS.
+GROUP_TYPES = {"string": STRING_CONST, "int": INT_CONST, "symbol": SYMBOL}
+
+# The same grammar over the raw bytes of a memory-mapped file, see
+# JackTokenizer.token_split_bytes. A single group holds the token, so that
+# findall collects every token in one call, and the type of a token is told
+# by its first byte instead of by a group. Bytes patterns only know ASCII,
+# which is all Jack is made of besides the contents of string constants.
+BYTES_TOKEN_REGEX = re.compile(rb"""
+    (?:
+        \s+                            # whitespace
+      | //[^\n]*                       # comment until the line's end
+      | /\*.*?\*/                      # /* comment */ and /** API comment */
+    )*
+    (
+        "[^"\n]*"                      # stringConstant
+      | \d+                            # integerConstant
+      | [^\W\d]\w*                     # keyword or identifier
+      | [{}()\[\].,;+\-*&|<>=~^\#]      # symbol
+      | /(?!\*)                        # '/', unless it opens a comment
+      | /\*                            # a comment that is never closed
+      | \S                             # an unexpected character
+      | \Z                             # trailing whitespace and comments
+    )
+""", re.VERBOSE | re.DOTALL)
+# The type code of a token by its first byte, as a bytes.translate() table.
+# Words are identifiers until they are found in KEYWORD_BYTES. Errors that
+# start like a valid token, a lone '"' or an unclosed "/*", are found by
+# token_split_bytes instead.
+UNEXPECTED = 255
+FIRST_BYTE_TYPES = bytes(
+    STRING_CONST if byte == ord('"') else
+    INT_CONST if chr(byte).isdigit() else
+    IDENTIFIER if chr(byte).isalpha() or byte == ord('_') else
+    SYMBOL if chr(byte) in "{}()[].,;+-*/&|<>=~^#" else
+    UNEXPECTED for byte in range(128)) + bytes([UNEXPECTED] * 128)
+# Tokens that are looked up instead of decoded.
+KEYWORD_BYTES = {keyword.encode(): keyword for keyword in KEYWORDS}
+SYMBOL_BYTES = {symbol.encode(): symbol for symbol in "{}()[].,;+-*/&|<>=~^#"}
+
+# Characters read from the input at a time in streaming mode.
+CHUNK_SIZE = 1 << 16
+# The whitespace and complete comments in front of a token, see iter_tokens.
+SKIP_REGEX = re.compile(r"(?:\s+|//[^\n]*|/\*.*?\*/)*", re.DOTALL)
+# What ends a string constant, or the line it is on if it is never closed.
+STRING_END_REGEX = re.compile(r'["\n]')
+
+
+def iter_tokens(input_stream: typing.TextIO,
+                chunk_size: int = CHUNK_SIZE) -> typing.Iterator[typing.Tuple[str, int]]:
+    """Lazily yields the tokens of input_stream, reading it in chunks.
+
+    Only the unconsumed tail of the current chunk is kept in memory. A match
+    that reaches the end of the buffer may be cut short by the chunk boundary
+    (an identifier, a comment or a string constant that continues in the next
+    chunk), and a stray '/' or '"' may open a comment or string whose end was
+    not read yet, so in both cases more input is read and the tail is scanned
+    again before anything is yielded. A block comment that is still open is
+    dropped as it is read, and only new input is searched for its end or for
+    the end of an open string, so neither is scanned more than once.
+
+    Args:
+        input_stream (typing.TextIO): input stream.
+        chunk_size (int): number of characters to read at a time.
+
+    Yields:
+        typing.Tuple[str, int]: the next token and its type code.
+    """
+    buffer = ""
+    line = 1
+    at_eof = False
+    while True:
+        consumed = 0
+        for match in TOKEN_REGEX.finditer(buffer):
+            group = match.lastgroup
+            if not at_eof and (match.end() == len(buffer) or group == "error"):
+                break
+            if group == "word":
+                token = match.group("word")
+                yield token, KEYWORD if token in KEYWORDS else IDENTIFIER
+            elif group == "error":
+                line += buffer.count("\n", 0, match.start("error"))
+                raise ValueError(f"Unexpected character {match.group('error')!r} in line {line}")
+            elif group is not None:
+                yield match.group(group), GROUP_TYPES[group]
+            consumed = match.end()
+        line += buffer.count("\n", 0, consumed)
+        buffer = buffer[consumed:]
+        if at_eof:
+            return
+        start = SKIP_REGEX.match(buffer).end()
+        if buffer.startswith("/*", start):
+            # Every complete comment was skipped, so this one is open.
+            line += buffer.count("\n", 0, start)
+            comment_line = line
+            body = buffer[start + 2:]
+            end = body.find("*/")
+            while end < 0:
+                # The last character is kept, as it may start the "*/".
+                line += body.count("\n", 0, len(body) - 1)
+                chunk = input_stream.read(chunk_size)
+                if not chunk:
+                    raise ValueError(f"Unexpected character '/' in line {comment_line}")
+                body = body[-1:] + chunk
+                end = body.find("*/")
+            line += body.count("\n", 0, end)
+            buffer = body[end + 2:]
+            continue
+        if buffer.startswith('"', start) and not STRING_END_REGEX.search(buffer, start + 1):
+            # The string is open: read until it or its line ends.
+            searched = start + 1
+            while not at_eof and not STRING_END_REGEX.search(buffer, searched):
+                searched = len(buffer)
+                chunk = input_stream.read(chunk_size)
+                at_eof = not chunk
+                buffer += chunk
+            continue
+        chunk = input_stream.read(chunk_size)
+        at_eof = not chunk
+        buffer += chunk
+
 
 class JackTokenizer:
     """Removes all comments from the input stream and breaks it
@@ -93,27 +251,47 @@ class JackTokenizer:
     Note that ^, # correspond to shiftleft and shiftright, respectively.
     """
 
-    def __init__(self, input_stream: typing.TextIO) -> None:
+    def __init__(self, input_stream: typing.TextIO, streaming: bool = False,
+                 mapped: bool = False) -> None:
         """Opens the input stream and gets ready to tokenize it.
 
         Args:
             input_stream (typing.TextIO): input stream.
+            streaming (bool): if True, tokens are read lazily from the stream
+            in chunks instead of tokenizing the whole input up front, so
+            memory use does not grow with the size of the input.
+            mapped (bool): if True, input_stream is a binary file, which is
+            memory-mapped and tokenized as bytes, see token_split_bytes.
         """
         # Your code goes here!
         # A good place to start is to read all the lines of the input:
         # input_lines = input_stream.read().splitlines()
-        self.input_lines = self.comment_remover(input_stream.read()).splitlines()
-
-        for i in range(len(self.input_lines)):  # remove all spaces and comments
-            line = self.input_lines[i].replace("\t", " ").replace("  ", " ").split("//")[
-                0]  # todo: check that the second replace is ok
-            self.input_lines[i] = " ".join(line.split())
-
-        self.tokens = []
-        self.token_split()
+        self.streaming = streaming
+        self.mapped = mapped and not streaming
+        # The value of every integer constant, by the index of its token.
+        self.int_values = dict()
+        if streaming:
+            self.token_stream = iter_tokens(input_stream)
+        elif self.mapped:
+            try:
+                data = mmap.mmap(input_stream.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # An empty file cannot be mapped.
+                data = b""
+            try:
+                self.token_split_bytes(data)
+            finally:
+                if isinstance(data, mmap.mmap):
+                    data.close()
+        else:
+            self.tokens = []
+            self.token_types = array.array('B')
+            self.token_split(input_stream.read())
 
         self.token_i = -1
         self.current_token = ''
+        self.current_type = "IDENTIFIER"
+        self.current_int = 0
 
     """def comment_remover(self, text):
         def replacer(match):
@@ -159,51 +337,72 @@ class JackTokenizer:
                         string)  # remove all occurrence single-line comments (//COMMENT\n ) from string
         return string"""
 
-    def token_split(self):
-        KEYWORDS = ['class', 'constructor', 'function', 'method', 'field', 'static', 'var', 'int', 'char', 'boolean',
-                    'void', 'true', 'false', 'null', 'this', 'let', 'do', 'if', 'else', 'while', 'return']
-        SYMBOLS = ['{', '}', '(', ')', '[', ']', '.', ',', ';', '+', '-', '*', '/', '&', '|', '<', '>', '=', '~', '^',
-                   '#']
-        for line in self.input_lines:
-            line_cpy = line
-
-            #if ("charAt" in line_cpy):
-            #    x=3
-            while len(line_cpy) > 0:
-                not_string = True
-                token = ''
-                for saved_word in KEYWORDS:
-                    if line_cpy.startswith(saved_word+" ") or line_cpy.startswith(saved_word+";"): # and (line_cpy.replace(saved_word, "")[0] in SYMBOLS + [" "]):
-                        token = saved_word
-                        break
-                for saved_word in SYMBOLS:
-                    if line_cpy.startswith(saved_word):
-                        token = saved_word
-                        break
-                if token == '':
-                    if line_cpy.startswith('"'):
-                        token = '"' + line_cpy[1:].split('"')[0] + '"'
-                        not_string = False
-                    else:
-                        token = line_cpy
-                        for saved_word in KEYWORDS:
-                            if (" " + saved_word + " ") in line_cpy or (" " + saved_word + ";") in line_cpy:
-                                temp_token = line_cpy.split(saved_word)[0]
-                                if len(token) >= len(temp_token):
-                                    token = temp_token
-                        for saved_word in SYMBOLS:
-                            if saved_word in line_cpy:
-                                temp_token = line_cpy.split(saved_word)[0]
-                                if len(token) >= len(temp_token):
-                                    token = temp_token
-                if ' ' in token and not_string:
-                    token = token.split(' ')[0]
-                    line_cpy = line_cpy.replace(' ', '', 1)
-                if token != '':
-                    self.tokens.append(token)
-                line_cpy = line_cpy.replace(token, '', 1)
-                while len(line_cpy) > 0 and line_cpy.startswith(" "):
-                    line_cpy = line_cpy[1:]
+    def token_split(self, text: str) -> None:
+        """Breaks the given source text into tokens in a single linear scan.
+
+        Each TOKEN_REGEX match consumes the whitespace and comments before a
+        token together with the token itself, and the group it matched in
+        gives the token's type, which is stored in self.token_types. Integer
+        constants are parsed here too, into self.int_values.
+
+        Args:
+            text (str): the full source text, comments included.
+        """
+        append = self.tokens.append
+        append_type = self.token_types.append
+        for match in TOKEN_REGEX.finditer(text):
+            group = match.lastgroup
+            if group == "word":
+                token = match.group("word")
+                append(token)
+                append_type(KEYWORD if token in KEYWORDS else IDENTIFIER)
+            elif group == "error":
+                line = text.count("\n", 0, match.start("error")) + 1
+                raise ValueError(f"Unexpected character {match.group('error')!r} in line {line}")
+            elif group == "int":
+                token = match.group("int")
+                self.int_values[len(self.tokens)] = int(token)
+                append(token)
+                append_type(INT_CONST)
+            elif group is not None:
+                append(match.group(group))
+                append_type(GROUP_TYPES[group])
+
+    def token_split_bytes(self, data: typing.Union[bytes, mmap.mmap]) -> None:
+        """Breaks the given source into tokens like token_split does, but
+        over its raw bytes, so that the source is never read into memory and
+        decoded as a whole. The tokens are kept as bytes, and their types are
+        found for all of them at once from their first bytes; advance() turns
+        the current token into a str, and decodes only identifiers and
+        constants to do so.
+
+        Sources with an error or a non-ASCII letter outside of strings and
+        comments, which only the text lexer tells apart, are decoded and
+        tokenized again by token_split, so that they are handled and reported
+        exactly like in the other modes.
+
+        Args:
+            data (typing.Union[bytes, mmap.mmap]): the full source, UTF-8
+            encoded.
+        """
+        tokens = BYTES_TOKEN_REGEX.findall(data)
+        # Only the end of the input gives an empty token.
+        while tokens and not tokens[-1]:
+            tokens.pop()
+        self.tokens = tokens
+        self.token_types = bytes(map(operator.itemgetter(0), tokens)).translate(
+            FIRST_BYTE_TYPES)
+        types = self.token_types
+        index = types.find(INT_CONST)
+        while index >= 0:
+            self.int_values[index] = int(tokens[index])
+            index = types.find(INT_CONST, index + 1)
+        if UNEXPECTED in self.token_types or b'"' in tokens or b"/*" in tokens:
+            self.mapped = False
+            self.int_values = dict()
+            self.tokens = []
+            self.token_types = array.array('B')
+            self.token_split(str(data, "utf-8"))
 
     def has_more_tokens(self) -> bool:
         """Do we have more tokens in the input?
@@ -212,6 +411,8 @@ class JackTokenizer:
             bool: True if there are more tokens, False otherwise.
         """
         # Your code goes here!
+        if self.streaming:
+            return self.token_i < 0 or self.current_token != ""
         return self.token_i < len(self.tokens)
 
     def advance(self) -> None:
@@ -221,10 +422,31 @@ class JackTokenizer:
         """
         # Your code goes here!
         self.token_i += 1
-        if self.has_more_tokens():
+        if self.streaming:
+            self.current_token, code = next(self.token_stream, ("", IDENTIFIER))
+            if code == INT_CONST:
+                # Streamed tokens are lexed one at a time, as they are read.
+                self.current_int = int(self.current_token)
+        elif self.mapped and self.has_more_tokens():
+            token = self.tokens[self.token_i]
+            code = self.token_types[self.token_i]
+            if code == SYMBOL:
+                self.current_token = SYMBOL_BYTES[token]
+            elif code == IDENTIFIER and token in KEYWORD_BYTES:
+                self.current_token = KEYWORD_BYTES[token]
+                code = KEYWORD
+            else:
+                self.current_token = token.decode()
+                if code == INT_CONST:
+                    self.current_int = self.int_values[self.token_i]
+        elif self.has_more_tokens():
             self.current_token = self.tokens[self.token_i]
+            code = self.token_types[self.token_i]
+            if code == INT_CONST:
+                self.current_int = self.int_values[self.token_i]
         else:
-            self.current_token = ""
+            self.current_token, code = "", IDENTIFIER
+        self.current_type = TOKEN_TYPES[code]
 
     def token_type(self) -> str:
         """
@@ -233,19 +455,7 @@ class JackTokenizer:
             "KEYWORD", "SYMBOL", "IDENTIFIER", "INT_CONST", "STRING_CONST"
         """
         # Your code goes here!
-        KEYWORDS = ['class', 'constructor', 'function', 'method', 'field', 'static', 'var', 'int', 'char', 'boolean',
-                    'void', 'true', 'false', 'null', 'this', 'let', 'do', 'if', 'else', 'while', 'return']
-        SYMBOLS = ['{', '}', '(', ')', '[', ']', '.', ',', ';', '+', '-', '*', '/', '&', '|', '<', '>', '=', '~', '^',
-                   '#']
-        if self.current_token in KEYWORDS:
-            return "KEYWORD"
-        if self.current_token in SYMBOLS:
-            return "SYMBOL"
-        if self.current_token.isdigit() and 0 <= int(self.current_token.isdigit()) <= 32767:
-            return "INT_CONST"
-        if self.current_token and self.current_token[0] == self.current_token[-1] == '"':
-            return "STRING_CONST"
-        return "IDENTIFIER"
+        return self.current_type
 
     def keyword(self) -> str:
         """
@@ -293,7 +503,7 @@ class JackTokenizer:
             integerConstant: A decimal number in the range 0-32767.
         """
         # Your code goes here!
-        return int(self.current_token)
+        return self.current_int
 
     def string_val(self) -> str:
         """
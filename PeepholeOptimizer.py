@@ -0,0 +1,132 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import typing
+
+# Segments whose value does not depend on pointer 1, so pushing them may be
+# moved across a "pop pointer 1".
+THAT_INDEPENDENT = ("constant", "local", "argument", "static", "this")
+
+
+class PeepholeOptimizer:
+    """Sits between the CompilationEngine and a VMWriter and has the same
+    interface. Commands are kept in a small sliding window, and every new
+    command is matched against the tail of the window to remove redundant
+    sequences before they are passed on to the writer:
+
+    - "not" followed by "not" is removed.
+    - "push S i" followed by "pop S i" is removed.
+    - "goto L" is removed when only labels separate it from "label L".
+    - "push X, pop temp 0, pop pointer 1, push temp 0, pop that 0", which an
+      array assignment of a simple value compiles to, becomes
+      "pop pointer 1, push X, pop that 0".
+
+    The window is drained at every function boundary, so patterns never span
+    two functions.
+    """
+    WINDOW_SIZE = 8
+
+    def __init__(self, writer) -> None:
+        """
+        Args:
+            writer: the VMWriter (or anything with the same interface) that
+            receives the optimized commands.
+        """
+        self.writer = writer
+        self.window = []
+        self.removed = 0
+
+    def emit(self, command: typing.Tuple) -> None:
+        """Adds a command to the window and applies the rules to its tail.
+
+        Args:
+            command (typing.Tuple): the command name followed by its
+            arguments, e.g. ("push", "local", 0).
+        """
+        window = self.window
+        window.append(command)
+        while self.reduce(window):
+            pass
+        while len(window) > PeepholeOptimizer.WINDOW_SIZE:
+            self.forward(window.pop(0))
+
+    def reduce(self, window: typing.List[typing.Tuple]) -> bool:
+        """Applies the first rule that matches the tail of the window.
+
+        Returns:
+            bool: True if the window was changed.
+        """
+        last = window[-1]
+        op = last[0]
+        if op == "arithmetic" and last[1] == "not" and len(window) > 1 and \
+                window[-2] == last:
+            del window[-2:]
+            self.removed += 2
+            return True
+        if op == "pop" and len(window) > 1 and \
+                window[-2] == ("push", last[1], last[2]):
+            del window[-2:]
+            self.removed += 2
+            return True
+        if op == "label":
+            i = len(window) - 2
+            while i >= 0 and window[i][0] == "label":
+                i -= 1
+            if i >= 0 and window[i] == ("goto", last[1]):
+                del window[i]
+                self.removed += 1
+                return True
+        if last == ("pop", "that", 0) and len(window) > 4 and \
+                window[-4:-1] == [("pop", "temp", 0), ("pop", "pointer", 1), ("push", "temp", 0)] and \
+                window[-5][0] == "push" and window[-5][1] in THAT_INDEPENDENT:
+            window[-5:] = [("pop", "pointer", 1), window[-5], last]
+            self.removed += 2
+            return True
+        return False
+
+    def forward(self, command: typing.Tuple) -> None:
+        """Passes a single command on to the writer."""
+        getattr(self.writer, "write_" + command[0])(*command[1:])
+
+    def drain(self) -> None:
+        """Passes every command left in the window on to the writer."""
+        for command in self.window:
+            self.forward(command)
+        self.window.clear()
+
+    def flush(self) -> None:
+        """Drains the window and flushes the writer."""
+        self.drain()
+        self.writer.flush()
+
+    def write_push(self, segment: str, index: int) -> None:
+        self.emit(("push", segment.lower(), index))
+
+    def write_pop(self, segment: str, index: int) -> None:
+        self.emit(("pop", segment.lower(), index))
+
+    def write_arithmetic(self, command: str) -> None:
+        self.emit(("arithmetic", command.lower()))
+
+    def write_label(self, label: str) -> None:
+        self.emit(("label", label))
+
+    def write_goto(self, label: str) -> None:
+        self.emit(("goto", label))
+
+    def write_if(self, label: str) -> None:
+        self.emit(("if", label))
+
+    def write_call(self, name: str, n_args: int) -> None:
+        self.emit(("call", name, n_args))
+
+    def write_function(self, name: str, n_locals: int) -> None:
+        self.drain()
+        self.writer.write_function(name, n_locals)
+
+    def write_return(self) -> None:
+        self.emit(("return",))
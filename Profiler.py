@@ -0,0 +1,150 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import time
+import tracemalloc
+import typing
+
+
+class PhaseProfiler:
+    """Measures the wall time and the memory allocations of named phases of
+    a compilation. Phases may be nested, e.g. writing the output while
+    compiling; the time and memory a nested phase takes is counted for it
+    and not for the phase around it.
+
+    Allocations are only measured while tracemalloc is tracing, which slows
+    everything down, so times and allocations should come from separate runs
+    (see merge).
+    """
+
+    def __init__(self) -> None:
+        self.phases = dict()
+        self.stack = []
+
+    def start(self, phase: str) -> None:
+        # The frame is made before measuring, so that it is not counted as
+        # memory the phase allocated; it is freed before the parent stops.
+        frame = {"phase": phase, "start": 0.0, "memory": 0, "peak": 0,
+                 "nested_seconds": 0.0, "nested_bytes": 0}
+        self.stack.append(frame)
+        tracing = tracemalloc.is_tracing()
+        memory = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        if len(self.stack) > 1:
+            parent = self.stack[-2]
+            parent["peak"] = max(parent["peak"], memory[1])
+        if tracing:
+            tracemalloc.reset_peak()
+        frame["memory"] = memory[0]
+        frame["start"] = time.perf_counter()
+
+    def stop(self) -> None:
+        end = time.perf_counter()
+        tracing = tracemalloc.is_tracing()
+        current, peak = tracemalloc.get_traced_memory() if tracing else (0, 0)
+        frame = self.stack.pop()
+        seconds = end - frame["start"]
+        allocated = current - frame["memory"]
+        peak = max(frame["peak"], peak)
+        entry = self.phases.setdefault(
+            frame["phase"], {"seconds": 0.0, "allocated_bytes": 0, "peak_bytes": 0})
+        entry["seconds"] += seconds - frame["nested_seconds"]
+        entry["allocated_bytes"] += allocated - frame["nested_bytes"]
+        entry["peak_bytes"] = max(entry["peak_bytes"], peak - frame["memory"])
+        if self.stack:
+            parent = self.stack[-1]
+            parent["nested_seconds"] += seconds
+            parent["nested_bytes"] += allocated
+            parent["peak"] = max(parent["peak"], peak)
+
+    def run(self, phase: str, function: typing.Callable, *args) -> typing.Any:
+        """Calls function(*args) as the given phase.
+
+        Returns:
+            typing.Any: what function returned.
+        """
+        self.start(phase)
+        try:
+            return function(*args)
+        finally:
+            self.stop()
+
+    @staticmethod
+    def merge(timed: typing.Dict, traced: typing.Dict) -> typing.Dict:
+        """
+        Args:
+            timed (typing.Dict): the phases of a run without tracemalloc.
+            traced (typing.Dict): the phases of the same work, traced.
+
+        Returns:
+            typing.Dict: the seconds of the first with the bytes of the second.
+        """
+        return {phase: {"seconds": entry["seconds"],
+                        "allocated_bytes": traced.get(phase, entry)["allocated_bytes"],
+                        "peak_bytes": traced.get(phase, entry)["peak_bytes"]}
+                for phase, entry in timed.items()}
+
+
+class ProfiledStream:
+    """Wraps the output stream of a compilation, counting the lines written
+    to it and measuring the writes as the "emit" phase of a PhaseProfiler.
+    """
+
+    def __init__(self, output_stream: typing.TextIO, profiler: PhaseProfiler) -> None:
+        self.output_stream = output_stream
+        self.profiler = profiler
+        self.lines = 0
+
+    def write(self, text: str) -> None:
+        self.lines += text.count("\n")
+        self.profiler.run("emit", self.output_stream.write, text)
+
+
+class ProfiledWriter:
+    """Sits in front of a VMWriter, has the same interface and measures
+    every call as the "emit" phase of a PhaseProfiler, so that formatting
+    and writing the commands is told apart from compiling them.
+    """
+
+    def __init__(self, writer, profiler: PhaseProfiler) -> None:
+        """
+        Args:
+            writer: the VMWriter, or anything with the same interface, to
+            pass every command on to.
+            profiler (PhaseProfiler): measures the calls.
+        """
+        self.writer = writer
+        self.profiler = profiler
+
+    def write_push(self, segment: str, index: int) -> None:
+        self.profiler.run("emit", self.writer.write_push, segment, index)
+
+    def write_pop(self, segment: str, index: int) -> None:
+        self.profiler.run("emit", self.writer.write_pop, segment, index)
+
+    def write_arithmetic(self, command: str) -> None:
+        self.profiler.run("emit", self.writer.write_arithmetic, command)
+
+    def write_label(self, label: str) -> None:
+        self.profiler.run("emit", self.writer.write_label, label)
+
+    def write_goto(self, label: str) -> None:
+        self.profiler.run("emit", self.writer.write_goto, label)
+
+    def write_if(self, label: str) -> None:
+        self.profiler.run("emit", self.writer.write_if, label)
+
+    def write_call(self, name: str, n_args: int) -> None:
+        self.profiler.run("emit", self.writer.write_call, name, n_args)
+
+    def write_function(self, name: str, n_locals: int) -> None:
+        self.profiler.run("emit", self.writer.write_function, name, n_locals)
+
+    def write_return(self) -> None:
+        self.profiler.run("emit", self.writer.write_return)
+
+    def flush(self) -> None:
+        self.profiler.run("emit", self.writer.flush)
@@ -0,0 +1,94 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+
+# Every rewrite below leaves the operand x in temp 1 while it needs it more
+# than once. No call happens in between, so nothing else can overwrite it.
+
+
+def write_shifts(writer, count: int) -> None:
+    """Writes count "shiftleft" commands, multiplying the top of the stack
+    by 2 ** count.
+    """
+    for _ in range(count):
+        writer.write_arithmetic("SHIFTLEFT")
+
+
+def write_multiply_by_constant(writer, factor: int) -> bool:
+    """Multiplies the value on top of the stack by a constant without calling
+    Math.multiply, if factor is a power of two (shifts), has two set bits
+    ((x << a) + (x << b)), or is one less than a power of two
+    ((x << a) - x). All of these agree with Math.multiply modulo 2 ** 16.
+
+    Args:
+        writer: a VMWriter, or anything with the same interface.
+        factor (int): the constant, as a 16-bit word.
+
+    Returns:
+        bool: True if code was written, False if factor has no cheap form
+        and nothing was written.
+    """
+    magnitude = abs(factor)
+    if magnitude == 0:
+        writer.write_push("CONSTANT", 0)
+        writer.write_arithmetic("AND")
+        return True
+    low = (magnitude & -magnitude).bit_length() - 1
+    rest = magnitude & (magnitude - 1)
+    if rest == 0:
+        write_shifts(writer, low)
+    elif rest & (rest - 1) == 0:
+        writer.write_pop("TEMP", 1)
+        writer.write_push("TEMP", 1)
+        write_shifts(writer, rest.bit_length() - 1)
+        writer.write_push("TEMP", 1)
+        write_shifts(writer, low)
+        writer.write_arithmetic("ADD")
+    elif (magnitude + 1) & magnitude == 0:
+        writer.write_pop("TEMP", 1)
+        writer.write_push("TEMP", 1)
+        write_shifts(writer, magnitude.bit_length())
+        writer.write_push("TEMP", 1)
+        writer.write_arithmetic("SUB")
+    else:
+        return False
+    if factor < 0:
+        writer.write_arithmetic("NEG")
+    return True
+
+
+def write_divide_by_constant(writer, divisor: int) -> bool:
+    """Divides the value on top of the stack by a constant power of two
+    without calling Math.divide. Math.divide rounds towards zero while an
+    arithmetic shift rounds down, so negative dividends are first biased by
+    divisor - 1: x / 2 ** k == (x + ((x < 0) & (2 ** k - 1))) >> k.
+
+    Args:
+        writer: a VMWriter, or anything with the same interface.
+        divisor (int): the constant, as a 16-bit word.
+
+    Returns:
+        bool: True if code was written, False if divisor is not a power of
+        two (or zero) and nothing was written.
+    """
+    magnitude = abs(divisor)
+    if magnitude == 0 or magnitude & (magnitude - 1):
+        return False
+    if magnitude > 1:
+        writer.write_pop("TEMP", 1)
+        writer.write_push("TEMP", 1)
+        writer.write_push("TEMP", 1)
+        writer.write_push("CONSTANT", 0)
+        writer.write_arithmetic("LT")
+        writer.write_push("CONSTANT", magnitude - 1)
+        writer.write_arithmetic("AND")
+        writer.write_arithmetic("ADD")
+        for _ in range(magnitude.bit_length() - 1):
+            writer.write_arithmetic("SHIFTRIGHT")
+    if divisor < 0:
+        writer.write_arithmetic("NEG")
+    return True
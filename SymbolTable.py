@@ -8,10 +8,21 @@ Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
 import typing
 
 
+class Symbol(typing.NamedTuple):
+    """The information the symbol table keeps about a single identifier."""
+    type: str
+    kind: str
+    index: int
+
+
 class SymbolTable:
     """A symbol table that associates names with information needed for Jack
     compilation: type, kind and running index. The symbol table has two nested
     scopes (class/subroutine).
+
+    Besides the two scopes, the table keeps a merged view of the names that
+    are visible right now (subroutine names shadowing class names), and a
+    running count per kind, so every query is a single dict lookup.
     """
     SUB_KIND = ["local", "argument"]
 
@@ -19,6 +30,10 @@ class SymbolTable:
         """Creates a new empty symbol table."""
         self.class_symbols = dict()
         self.subroutine_symbols = dict()
+        self.symbols = dict()
+        self.counts = dict()
+        # The number of identifiers defined so far, in every scope.
+        self.defined = 0
 
     def get_symbol_table(self, kind):
         current_dict = self.subroutine_symbols
@@ -30,7 +45,14 @@ class SymbolTable:
         """Starts a new subroutine scope (i.e., resets the subroutine's 
         symbol table).
         """
+        for name in self.subroutine_symbols:
+            if name in self.class_symbols:
+                self.symbols[name] = self.class_symbols[name]
+            else:
+                del self.symbols[name]
         self.subroutine_symbols.clear()
+        for kind in SymbolTable.SUB_KIND:
+            self.counts[kind] = 0
 
     def define(self, name: str, type: str, kind: str, is_method=False) -> None:
         """Defines a new identifier of a given name, type and kind and assigns 
@@ -45,10 +67,15 @@ class SymbolTable:
             "STATIC", "FIELD", "ARG", "VAR".
         """
         current_dict = self.get_symbol_table(kind)
-        index = self.var_count(kind)
+        index = self.counts.get(kind, 0)
+        self.counts[kind] = index + 1
+        self.defined += 1
         if is_method and kind == "argument":
             index += 1
-        current_dict[name] = (type, kind, index)
+        symbol = Symbol(type, kind, index)
+        current_dict[name] = symbol
+        if current_dict is self.subroutine_symbols or name not in self.subroutine_symbols:
+            self.symbols[name] = symbol
 
     def var_count(self, kind: str) -> int:
         """
@@ -59,12 +86,7 @@ class SymbolTable:
             int: the number of variables of the given kind already defined in 
             the current scope.
         """
-        current_dict = self.get_symbol_table(kind)
-        counter = 0
-        for s_type, s_kind, s_i in current_dict.values():
-            if s_kind == kind:
-                counter += 1
-        return counter
+        return self.counts.get(kind, 0)
 
     def kind_of(self, name: str) -> str:
         """
@@ -75,10 +97,7 @@ class SymbolTable:
             str: the kind of the named identifier in the current scope, or None
             if the identifier is unknown in the current scope.
         """
-        if name in self.subroutine_symbols.keys():
-            return self.subroutine_symbols[name][1]
-        else:
-            return self.class_symbols[name][1]
+        return self.symbols[name].kind
 
     def type_of(self, name: str) -> str:
         """
@@ -88,10 +107,7 @@ class SymbolTable:
         Returns:
             str: the type of the named identifier in the current scope.
         """
-        if name in self.class_symbols.keys():
-            return self.class_symbols[name][0]
-        else:
-            return self.subroutine_symbols[name][0]
+        return self.symbols[name].type
 
     def index_of(self, name: str) -> int:
         """
@@ -101,10 +117,7 @@ class SymbolTable:
         Returns:
             int: the index assigned to the named identifier.
         """
-        if name in self.subroutine_symbols.keys():
-            return self.subroutine_symbols[name][2]
-        else:
-            return self.class_symbols[name][2]
+        return self.symbols[name].index
 
     def contains(self, name: str) -> bool:
-        return (name in self.class_symbols.keys()) or (name in self.subroutine_symbols.keys())
+        return name in self.symbols
@@ -0,0 +1,108 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import typing
+
+
+class UnreachableCodeRemover:
+    """Sits in front of a VMWriter and has the same interface. The commands
+    of each function are held back until the function is complete, since a
+    label may be jumped to from anywhere in it, and are then cleaned up
+    until nothing changes:
+
+    - commands after "goto" or "return" are removed up to the next label
+      that something jumps to, since no path reaches them.
+    - "goto L" is removed when only labels separate it from "label L".
+    - labels that no "goto" or "if-goto" refers to are removed.
+    """
+
+    def __init__(self, writer) -> None:
+        """
+        Args:
+            writer: the VMWriter (or anything with the same interface) that
+            receives the remaining commands.
+        """
+        self.writer = writer
+        self.commands = []
+        self.removed = 0
+
+    def clean(self, commands: typing.List[typing.Tuple]) -> typing.List[typing.Tuple]:
+        """Applies the rules above to the commands of one function.
+
+        Args:
+            commands (typing.List[typing.Tuple]): the command name followed by
+            its arguments, e.g. ("goto", "IF_END0"), in order.
+
+        Returns:
+            typing.List[typing.Tuple]: the remaining commands.
+        """
+        while True:
+            targets = {command[1] for command in commands
+                       if command[0] == "goto" or command[0] == "if"}
+            cleaned = []
+            reachable = True
+            for i, command in enumerate(commands):
+                op = command[0]
+                if op == "label":
+                    if command[1] not in targets:
+                        continue
+                    reachable = True
+                if not reachable:
+                    continue
+                if op == "goto":
+                    j = i + 1
+                    while j < len(commands) and commands[j][0] == "label" and \
+                            commands[j][1] != command[1]:
+                        j += 1
+                    if j < len(commands) and commands[j] == ("label", command[1]):
+                        continue
+                if op == "goto" or op == "return":
+                    reachable = False
+                cleaned.append(command)
+            if len(cleaned) == len(commands):
+                return cleaned
+            self.removed += len(commands) - len(cleaned)
+            commands = cleaned
+
+    def drain(self) -> None:
+        """Cleans the held back commands and passes them on to the writer."""
+        for command in self.clean(self.commands):
+            getattr(self.writer, "write_" + command[0])(*command[1:])
+        self.commands.clear()
+
+    def flush(self) -> None:
+        """Drains the current function and flushes the writer."""
+        self.drain()
+        self.writer.flush()
+
+    def write_push(self, segment: str, index: int) -> None:
+        self.commands.append(("push", segment.lower(), index))
+
+    def write_pop(self, segment: str, index: int) -> None:
+        self.commands.append(("pop", segment.lower(), index))
+
+    def write_arithmetic(self, command: str) -> None:
+        self.commands.append(("arithmetic", command))
+
+    def write_label(self, label: str) -> None:
+        self.commands.append(("label", label))
+
+    def write_goto(self, label: str) -> None:
+        self.commands.append(("goto", label))
+
+    def write_if(self, label: str) -> None:
+        self.commands.append(("if", label))
+
+    def write_call(self, name: str, n_args: int) -> None:
+        self.commands.append(("call", name, n_args))
+
+    def write_function(self, name: str, n_locals: int) -> None:
+        self.drain()
+        self.writer.write_function(name, n_locals)
+
+    def write_return(self) -> None:
+        self.commands.append(("return",))
@@ -0,0 +1,243 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import argparse
+import sys
+import typing
+
+# Every module of a bytecode file starts with these bytes.
+MAGIC = b"JVMB\x01"
+# A command is its opcode, one byte: the index of its name here.
+OPCODES = ("push", "pop", "add", "sub", "neg", "eq", "gt", "lt", "and", "or",
+           "not", "shiftleft", "shiftright", "label", "goto", "if-goto",
+           "function", "call", "return")
+OPCODE_OF = {name: code for code, name in enumerate(OPCODES)}
+# push and pop are followed by a segment, one byte: its index here.
+SEGMENTS = ("constant", "argument", "local", "static", "this", "that",
+            "pointer", "temp")
+SEGMENT_OF = {name: code for code, name in enumerate(SEGMENTS)}
+PUSH, POP = OPCODE_OF["push"], OPCODE_OF["pop"]
+LABEL, GOTO, IF_GOTO = OPCODE_OF["label"], OPCODE_OF["goto"], OPCODE_OF["if-goto"]
+FUNCTION, CALL, RETURN = OPCODE_OF["function"], OPCODE_OF["call"], OPCODE_OF["return"]
+# How VMWriter writes "*" and "/".
+ARITHMETIC_CALLS = {"*": "Math.multiply", "/": "Math.divide"}
+
+
+def write_varint(buffer: bytearray, value: int) -> None:
+    """Appends an unsigned integer, 7 bits per byte, least significant first,
+    with the high bit set on every byte but the last.
+    """
+    if value < 0:
+        raise ValueError(f"Negative operand {value}")
+    while value > 0x7F:
+        buffer.append(value & 0x7F | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+class VMBytecodeWriter:
+    """Writes VM commands in a compact binary form instead of as text, and
+    has the same interface as VMWriter.
+
+    The commands written between two flushes make a module: MAGIC, the
+    number of strings followed by every string (its length in bytes, then
+    its UTF-8 bytes), then the number of commands followed by every command.
+    A command is its opcode (see OPCODES); push and pop add a segment code
+    (see SEGMENTS) and an index; label, goto and if-goto add the index of
+    their label in the string table; function and call add the index of the
+    function name and a count. Numbers are written as varints, see
+    write_varint. A file may hold several modules one after another.
+    """
+
+    def __init__(self, output_stream: typing.BinaryIO, flush_threshold: int = 0) -> None:
+        """
+        Args:
+            output_stream (typing.BinaryIO): the stream to write to.
+            flush_threshold (int): ignored; a module can only be written once
+            its string table is complete, i.e. by flush().
+        """
+        self.output_stream = output_stream
+        self.code = bytearray()
+        self.command_count = 0
+        self.strings = dict()
+
+    def string(self, text: str) -> int:
+        """
+        Returns:
+            int: the index of text in the string table of the module.
+        """
+        index = self.strings.get(text)
+        if index is None:
+            index = self.strings[text] = len(self.strings)
+        return index
+
+    def flush(self) -> None:
+        """Writes the commands written so far as a module."""
+        if not self.command_count:
+            return
+        module = bytearray(MAGIC)
+        write_varint(module, len(self.strings))
+        for text in self.strings:
+            encoded = text.encode()
+            write_varint(module, len(encoded))
+            module += encoded
+        write_varint(module, self.command_count)
+        module += self.code
+        self.output_stream.write(module)
+        self.code.clear()
+        self.command_count = 0
+        self.strings.clear()
+
+    def write_segment_command(self, opcode: int, segment: str, index: int) -> None:
+        self.command_count += 1
+        code = self.code
+        code.append(opcode)
+        code.append(SEGMENT_OF[segment.lower()])
+        write_varint(code, index)
+
+    def write_named_command(self, opcode: int, name: str, count: int = None) -> None:
+        self.command_count += 1
+        code = self.code
+        code.append(opcode)
+        write_varint(code, self.string(name))
+        if count is not None:
+            write_varint(code, count)
+
+    def write_push(self, segment: str, index: int) -> None:
+        self.write_segment_command(PUSH, segment, index)
+
+    def write_pop(self, segment: str, index: int) -> None:
+        self.write_segment_command(POP, segment, index)
+
+    def write_arithmetic(self, command: str) -> None:
+        if command in ARITHMETIC_CALLS:
+            self.write_call(ARITHMETIC_CALLS[command], 2)
+            return
+        self.command_count += 1
+        self.code.append(OPCODE_OF[command.lower()])
+
+    def write_label(self, label: str) -> None:
+        self.write_named_command(LABEL, label)
+
+    def write_goto(self, label: str) -> None:
+        self.write_named_command(GOTO, label)
+
+    def write_if(self, label: str) -> None:
+        self.write_named_command(IF_GOTO, label)
+
+    def write_call(self, name: str, n_args: int) -> None:
+        self.write_named_command(CALL, name, n_args)
+
+    def write_function(self, name: str, n_locals: int) -> None:
+        self.write_named_command(FUNCTION, name, n_locals)
+
+    def write_return(self) -> None:
+        self.command_count += 1
+        self.code.append(RETURN)
+
+
+class VMBytecodeReader:
+    """Decodes what VMBytecodeWriter writes, in a single pass over a
+    memoryview of the data, into one tuple per command of the same shape as
+    the words of its text form: (opcode name, segment, index) for push and
+    pop, (opcode name, name) for labels and jumps, (opcode name, name,
+    count) for function and call, and (opcode name,) for the rest.
+    """
+
+    def __init__(self, data: bytes) -> None:
+        """
+        Args:
+            data (bytes): the contents of a bytecode file.
+        """
+        self.view = memoryview(data)
+        self.position = 0
+        self.commands = []
+        while self.position < len(self.view):
+            self.read_module()
+
+    def read_byte(self) -> int:
+        if self.position >= len(self.view):
+            raise ValueError(f"Truncated VM bytecode module at byte {self.position}")
+        byte = self.view[self.position]
+        self.position += 1
+        return byte
+
+    def read_varint(self) -> int:
+        view = self.view
+        value = 0
+        shift = 0
+        while True:
+            if self.position >= len(view):
+                raise ValueError(f"Truncated VM bytecode module at byte {self.position}")
+            byte = view[self.position]
+            self.position += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def read_module(self) -> None:
+        view = self.view
+        if view[self.position:self.position + len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a VM bytecode module at byte {self.position}")
+        self.position += len(MAGIC)
+        strings = []
+        for _ in range(self.read_varint()):
+            length = self.read_varint()
+            if self.position + length > len(view):
+                raise ValueError(f"Truncated VM bytecode module at byte {len(view)}")
+            strings.append(str(view[self.position:self.position + length], "utf-8"))
+            self.position += length
+        commands = self.commands
+        for _ in range(self.read_varint()):
+            position = self.position
+            opcode = self.read_byte()
+            if opcode >= len(OPCODES):
+                raise ValueError(f"Unknown opcode {opcode} at byte {position}")
+            if opcode == PUSH or opcode == POP:
+                position = self.position
+                segment = self.read_byte()
+                if segment >= len(SEGMENTS):
+                    raise ValueError(f"Unknown segment {segment} at byte {position}")
+                commands.append((OPCODES[opcode], SEGMENTS[segment], self.read_varint()))
+            elif opcode == FUNCTION or opcode == CALL:
+                name = self.read_string(strings)
+                commands.append((OPCODES[opcode], name, self.read_varint()))
+            elif opcode == LABEL or opcode == GOTO or opcode == IF_GOTO:
+                commands.append((OPCODES[opcode], self.read_string(strings)))
+            else:
+                commands.append((OPCODES[opcode],))
+
+    def read_string(self, strings: typing.List[str]) -> str:
+        """
+        Returns:
+            str: the entry of the module's string table whose index is next.
+        """
+        position = self.position
+        index = self.read_varint()
+        if index >= len(strings):
+            raise ValueError(f"Unknown string {index} at byte {position}")
+        return strings[index]
+
+    def text(self) -> str:
+        """
+        Returns:
+            str: the commands as the text VMWriter would have written.
+        """
+        return "".join(" ".join(map(str, command)) + "\n" for command in self.commands)
+
+
+if "__main__" == __name__:
+    parser = argparse.ArgumentParser(
+        prog="VMBytecode",
+        description="Prints VM bytecode files as text VM code.")
+    parser.add_argument("input_paths", nargs="+", metavar="input_path",
+                        help="a bytecode file")
+    args = parser.parse_args()
+    for input_path in args.input_paths:
+        with open(input_path, 'rb') as input_file:
+            sys.stdout.write(VMBytecodeReader(input_file.read()).text())
@@ -0,0 +1,568 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import argparse
+import array
+import math
+import os
+import sys
+import time
+import typing
+from VMBytecode import VMBytecodeReader
+
+# The Hack memory map.
+RAM_SIZE = 32768
+SP, LCL, ARG, THIS, THAT = range(5)
+TEMP_BASE = 5
+STATIC_BASE, STATIC_END = 16, 256
+STACK_BASE, STACK_END = 256, 2048
+HEAP_BASE, HEAP_END = 2048, 16384
+# The first function that exists is where execution starts, see
+# VMProgram.ENTRY_POINTS.
+ENTRY_POINTS = ("Sys.init", "Main.main")
+
+# Opcodes of the decoded instruction stream. Segments are resolved while
+# decoding: constants, segments relative to a pointer, and fixed addresses
+# (temp, pointer and static) each get their own push and pop opcodes, and
+# labels disappear, jumps and calls holding the index they go to instead.
+(PUSH_CONSTANT, PUSH_LOCAL, PUSH_ARGUMENT, PUSH_POINTED, PUSH_ADDRESS,
+ POP_LOCAL, POP_ARGUMENT, POP_POINTED, POP_ADDRESS,
+ ADD, SUB, NEG, EQ, GT, LT, AND, OR, NOT, SHIFTLEFT, SHIFTRIGHT,
+ GOTO, IF_GOTO, FUNCTION, CALL, CALL_OS, RETURN) = range(26)
+ARITHMETIC_OPCODES = {"add": ADD, "sub": SUB, "neg": NEG, "eq": EQ, "gt": GT,
+                      "lt": LT, "and": AND, "or": OR, "not": NOT,
+                      "shiftleft": SHIFTLEFT, "shiftright": SHIFTRIGHT}
+POINTED_SEGMENTS = {"this": THIS, "that": THAT}
+
+# The Hack instructions a straightforward translation of each command
+# executes, which is what the cycle counter adds up. A function command
+# costs FUNCTION_CYCLES plus LOCAL_CYCLES per local, and OS functions cost
+# only their call.
+CYCLES = {PUSH_CONSTANT: 7, PUSH_LOCAL: 10, PUSH_ARGUMENT: 10,
+          PUSH_POINTED: 10, PUSH_ADDRESS: 7, POP_LOCAL: 12, POP_ARGUMENT: 12,
+          POP_POINTED: 12, POP_ADDRESS: 5, ADD: 5, SUB: 5, AND: 5, OR: 5,
+          NEG: 3, NOT: 3, SHIFTLEFT: 3, SHIFTRIGHT: 3, EQ: 13, GT: 13, LT: 13,
+          GOTO: 2, IF_GOTO: 4, CALL: 44, CALL_OS: 44, RETURN: 40}
+FUNCTION_CYCLES = 1
+LOCAL_CYCLES = 7
+# Character codes of the Jack character set.
+NEW_LINE, BACKSPACE, DOUBLE_QUOTE = 128, 129, 34
+
+
+def read_program(path: str) -> typing.List[typing.Tuple]:
+    """Reads compiled VM code: a .vm or .vmb file (e.g. one written by
+    JackCompiler --link), or a directory of them. In a directory, the .vmb
+    file of a class is only read if it has no .vm file.
+
+    Args:
+        path (str): the file or directory to read.
+
+    Returns:
+        typing.List[typing.Tuple]: the words of every command, e.g.
+        ("push", "local", 3), with the numbers as ints.
+    """
+    if os.path.isdir(path):
+        names = {}
+        for filename in sorted(os.listdir(path)):
+            class_name, extension = os.path.splitext(filename)
+            if extension == ".vm" or extension == ".vmb" and class_name not in names:
+                names[class_name] = os.path.join(path, filename)
+        paths = [names[class_name] for class_name in sorted(names)]
+    else:
+        paths = [path]
+    commands = []
+    for input_path in paths:
+        if input_path.endswith(".vmb"):
+            with open(input_path, 'rb') as input_file:
+                commands.extend(VMBytecodeReader(input_file.read()).commands)
+            continue
+        with open(input_path, 'r') as input_file:
+            for line in input_file:
+                words = line.split("//", 1)[0].split()
+                if words:
+                    commands.append(tuple(int(word) if word.isdigit() else word
+                                          for word in words))
+    return commands
+
+
+class VMInterpreter:
+    """Runs VM code on a model of the Hack platform: a RAM of 16-bit words,
+    with the stack, the segment pointers, the statics and the heap where the
+    Hack VM translator puts them. Static i of a class is at its own address,
+    given to the classes in the order their first function appears. A call
+    frame holds the usual five words, but the return address is kept outside
+    the RAM, so programs larger than the address space still run.
+
+    The commands are decoded once into parallel arrays of opcodes and
+    operands, so running them needs no parsing and no lookups. Calls to
+    functions the program does not define go to OS stubs written in Python
+    (see os_functions), which cover what programs commonly use from Math,
+    Memory, Array, String, Output, Keyboard, Screen and Sys. Screen output is
+    ignored, and text output is written to a stream.
+
+    Every run counts the commands it executed and an estimate of the Hack
+    CPU cycles they take, see CYCLES.
+    """
+
+    def __init__(self, commands: typing.List[typing.Tuple],
+                 output_stream: typing.TextIO = sys.stdout,
+                 input_stream: typing.Optional[typing.TextIO] = None) -> None:
+        """Decodes a program.
+
+        Args:
+            commands (typing.List[typing.Tuple]): the words of every command
+            of the program, see read_program.
+            output_stream (typing.TextIO): where Output functions write.
+            input_stream (typing.Optional[typing.TextIO]): where Keyboard
+            functions read lines from; without it they read nothing.
+        """
+        self.output_stream = output_stream
+        self.input_stream = input_stream
+        self.ram = array.array('h', bytes(2 * RAM_SIZE))
+        self.heap_top = HEAP_BASE
+        self.halted = False
+        self.instructions = 0
+        self.cycles = 0
+        self.os_functions = {
+            "Math.init": self.no_op, "Math.multiply": self.math_multiply,
+            "Math.divide": self.math_divide, "Math.min": min, "Math.max": max,
+            "Math.abs": abs, "Math.sqrt": self.math_sqrt,
+            "Memory.init": self.no_op, "Memory.alloc": self.memory_alloc,
+            "Memory.deAlloc": self.no_op, "Memory.peek": self.memory_peek,
+            "Memory.poke": self.memory_poke,
+            "Array.new": self.memory_alloc, "Array.dispose": self.no_op,
+            "String.new": self.string_new, "String.dispose": self.no_op,
+            "String.length": self.string_length,
+            "String.charAt": self.string_char_at,
+            "String.setCharAt": self.string_set_char_at,
+            "String.appendChar": self.string_append_char,
+            "String.eraseLastChar": self.string_erase_last_char,
+            "String.intValue": self.string_int_value,
+            "String.setInt": self.string_set_int,
+            "String.newLine": lambda: NEW_LINE,
+            "String.backSpace": lambda: BACKSPACE,
+            "String.doubleQuote": lambda: DOUBLE_QUOTE,
+            "Output.init": self.no_op, "Output.moveCursor": self.no_op,
+            "Output.printChar": self.output_print_char,
+            "Output.printString": self.output_print_string,
+            "Output.printInt": self.output_print_int,
+            "Output.println": lambda: self.output_print_char(NEW_LINE),
+            "Output.backSpace": lambda: self.output_print_char(BACKSPACE),
+            "Keyboard.init": self.no_op, "Keyboard.keyPressed": self.no_op,
+            "Keyboard.readChar": self.keyboard_read_char,
+            "Keyboard.readLine": self.keyboard_read_line,
+            "Keyboard.readInt": self.keyboard_read_int,
+            "Screen.init": self.no_op, "Screen.clearScreen": self.no_op,
+            "Screen.setColor": self.no_op, "Screen.drawPixel": self.no_op,
+            "Screen.drawLine": self.no_op, "Screen.drawRectangle": self.no_op,
+            "Screen.drawCircle": self.no_op,
+            "Sys.halt": self.sys_halt, "Sys.error": self.sys_error,
+            "Sys.wait": self.no_op,
+        }
+        self.decode(commands)
+
+    def decode(self, commands: typing.List[typing.Tuple]) -> None:
+        """Fills the instruction arrays: opcodes, a and b, the operands, and
+        cycles, the cost of each instruction.
+        """
+        # First pass: where every function and label is, and the statics.
+        functions = dict()
+        labels = dict()
+        static_bases = dict()
+        static_top = STATIC_BASE
+        function = None
+        index = 0
+        for command in commands:
+            if command[0] == "function":
+                function = command[1]
+                functions[function] = index
+            elif command[0] == "label":
+                labels[(function, command[1])] = index
+                continue
+            elif function is None:
+                raise ValueError(f"Command outside of a function: {' '.join(map(str, command))}")
+            index += 1
+        static_counts = dict()
+        for command in commands:
+            if command[0] == "function":
+                class_name = command[1].split(".")[0]
+                static_counts.setdefault(class_name, 0)
+            elif len(command) == 3 and command[1] == "static":
+                static_counts[class_name] = max(static_counts[class_name], command[2] + 1)
+        for class_name, count in static_counts.items():
+            static_bases[class_name] = static_top
+            static_top += count
+        if static_top > STATIC_END:
+            raise ValueError(f"{static_top - STATIC_BASE} static variables do not "
+                             f"fit in {STATIC_END - STATIC_BASE} words")
+
+        self.functions = functions
+        self.entry = next((functions[name] for name in ENTRY_POINTS if name in functions), None)
+        self.os_calls = []
+        opcodes = self.opcodes = array.array('B')
+        a = self.a = array.array('i')
+        b = self.b = array.array('i')
+        cycles = self.cycle_costs = array.array('i')
+        for command in commands:
+            op = command[0]
+            first = second = 0
+            if op == "label":
+                continue
+            if op == "push" or op == "pop":
+                segment, second = command[1], command[2]
+                if segment == "constant" and op == "push":
+                    # Wrapped to a 16-bit word, like every value in RAM.
+                    opcode, first = PUSH_CONSTANT, (second + 32768 & 0xFFFF) - 32768
+                elif segment == "local":
+                    opcode = PUSH_LOCAL if op == "push" else POP_LOCAL
+                elif segment == "argument":
+                    opcode = PUSH_ARGUMENT if op == "push" else POP_ARGUMENT
+                elif segment in POINTED_SEGMENTS:
+                    opcode = PUSH_POINTED if op == "push" else POP_POINTED
+                    first = POINTED_SEGMENTS[segment]
+                else:
+                    opcode = PUSH_ADDRESS if op == "push" else POP_ADDRESS
+                    if segment == "temp" and second < 8:
+                        first = TEMP_BASE + second
+                    elif segment == "pointer" and second < 2:
+                        first = THIS + second
+                    elif segment == "static":
+                        first = static_bases[function.split(".")[0]] + second
+                    else:
+                        raise ValueError(f"Invalid command: {op} {segment} {second}")
+            elif op in ARITHMETIC_OPCODES:
+                opcode = ARITHMETIC_OPCODES[op]
+            elif op == "goto" or op == "if-goto":
+                opcode = GOTO if op == "goto" else IF_GOTO
+                if (function, command[1]) not in labels:
+                    raise ValueError(f"Unknown label {command[1]} in {function}")
+                first = labels[(function, command[1])]
+            elif op == "function":
+                function = command[1]
+                opcode, second = FUNCTION, command[2]
+            elif op == "call":
+                second = command[2]
+                if command[1] in functions:
+                    opcode, first = CALL, functions[command[1]]
+                else:
+                    opcode, first = CALL_OS, len(self.os_calls)
+                    self.os_calls.append(command[1])
+            elif op == "return":
+                opcode = RETURN
+            else:
+                raise ValueError(f"Invalid command: {' '.join(map(str, command))}")
+            opcodes.append(opcode)
+            a.append(first)
+            b.append(second)
+            cycles.append(FUNCTION_CYCLES + LOCAL_CYCLES * second
+                          if opcode == FUNCTION else CYCLES[opcode])
+
+    def run(self, max_instructions: int = 0) -> int:
+        """Runs the program from its entry point (Sys.init, or else
+        Main.main) until it returns or calls Sys.halt. The RAM is not reset,
+        so a second run continues from the state the first left.
+
+        Args:
+            max_instructions (int): if positive, stop with a RuntimeError
+            after executing this many commands.
+
+        Returns:
+            int: the value the entry point returned, or 0 if halted.
+        """
+        if self.entry is None:
+            raise ValueError(f"None of {', '.join(ENTRY_POINTS)} is defined")
+        opcodes, a, b, costs = self.opcodes, self.a, self.b, self.cycle_costs
+        ram = self.ram
+        os_calls = [self.os_functions.get(name) or self.unknown_function(name)
+                    for name in self.os_calls]
+        returns = []
+        limit = max_instructions or -1
+        executed = 0
+        cycles = 0
+        # The bootstrap code calls the entry point with no arguments.
+        sp = STACK_BASE + 5
+        lcl = arg = sp
+        pc = self.entry
+        value = 0
+        self.halted = False
+        while True:
+            if executed == limit:
+                self.instructions += executed
+                self.cycles += cycles
+                raise RuntimeError(f"Stopped after {executed} instructions")
+            executed += 1
+            op = opcodes[pc]
+            cycles += costs[pc]
+            if op == PUSH_CONSTANT:
+                ram[sp] = a[pc]
+                sp += 1
+            elif op == PUSH_LOCAL:
+                ram[sp] = ram[lcl + b[pc]]
+                sp += 1
+            elif op == PUSH_ARGUMENT:
+                ram[sp] = ram[arg + b[pc]]
+                sp += 1
+            elif op == PUSH_ADDRESS:
+                ram[sp] = ram[a[pc]]
+                sp += 1
+            elif op == PUSH_POINTED:
+                ram[sp] = ram[ram[a[pc]] + b[pc]]
+                sp += 1
+            elif op == POP_LOCAL:
+                sp -= 1
+                ram[lcl + b[pc]] = ram[sp]
+            elif op == POP_ADDRESS:
+                sp -= 1
+                ram[a[pc]] = ram[sp]
+            elif op == POP_POINTED:
+                sp -= 1
+                ram[ram[a[pc]] + b[pc]] = ram[sp]
+            elif op == POP_ARGUMENT:
+                sp -= 1
+                ram[arg + b[pc]] = ram[sp]
+            elif op == IF_GOTO:
+                sp -= 1
+                if ram[sp]:
+                    pc = a[pc]
+                    continue
+            elif op == GOTO:
+                pc = a[pc]
+                continue
+            elif op <= SUB:
+                sp -= 1
+                result = ram[sp - 1] + ram[sp] if op == ADD else ram[sp - 1] - ram[sp]
+                if result > 32767:
+                    result -= 65536
+                elif result < -32768:
+                    result += 65536
+                ram[sp - 1] = result
+            elif op <= LT:
+                if op == NEG:
+                    ram[sp - 1] = -ram[sp - 1] if ram[sp - 1] != -32768 else -32768
+                else:
+                    sp -= 1
+                    x, y = ram[sp - 1], ram[sp]
+                    ram[sp - 1] = -(x == y if op == EQ else x > y if op == GT else x < y)
+            elif op <= NOT:
+                if op == NOT:
+                    ram[sp - 1] = ~ram[sp - 1]
+                else:
+                    sp -= 1
+                    ram[sp - 1] = ram[sp - 1] & ram[sp] if op == AND else ram[sp - 1] | ram[sp]
+            elif op == SHIFTLEFT:
+                ram[sp - 1] = ((ram[sp - 1] << 1) + 32768 & 0xFFFF) - 32768
+            elif op == SHIFTRIGHT:
+                ram[sp - 1] >>= 1
+            elif op == FUNCTION:
+                if sp + b[pc] > STACK_END:
+                    raise RuntimeError("Stack overflow")
+                for _ in range(b[pc]):
+                    ram[sp] = 0
+                    sp += 1
+            elif op == CALL:
+                if sp + 5 > STACK_END:
+                    raise RuntimeError("Stack overflow")
+                returns.append(pc + 1)
+                ram[sp] = 0
+                ram[sp + 1] = lcl
+                ram[sp + 2] = arg
+                ram[sp + 3] = ram[THIS]
+                ram[sp + 4] = ram[THAT]
+                arg = sp - b[pc]
+                sp += 5
+                lcl = sp
+                pc = a[pc]
+                continue
+            elif op == RETURN:
+                value = ram[sp - 1]
+                ram[arg] = value
+                sp = arg + 1
+                ram[THAT] = ram[lcl - 1]
+                ram[THIS] = ram[lcl - 2]
+                arg = ram[lcl - 3]
+                lcl = ram[lcl - 4]
+                if not returns:
+                    break
+                pc = returns.pop()
+                continue
+            else:
+                count = b[pc]
+                sp -= count
+                ram[SP], ram[LCL], ram[ARG] = sp, lcl, arg
+                result = os_calls[a[pc]](*ram[sp:sp + count]) or 0
+                ram[sp] = (result + 32768 & 0xFFFF) - 32768
+                sp += 1
+                if self.halted:
+                    value = 0
+                    break
+            pc += 1
+        ram[SP], ram[LCL], ram[ARG] = sp, lcl, arg
+        self.instructions += executed
+        self.cycles += cycles
+        return value
+
+    def unknown_function(self, name: str) -> typing.Callable:
+        def call(*args) -> None:
+            raise RuntimeError(f"Call to unknown function {name}")
+        return call
+
+    def no_op(self, *args) -> int:
+        return 0
+
+    def math_multiply(self, x: int, y: int) -> int:
+        return x * y
+
+    def math_divide(self, x: int, y: int) -> int:
+        if y == 0:
+            self.sys_error(3)
+        quotient = abs(x) // abs(y)
+        return quotient if (x < 0) == (y < 0) else -quotient
+
+    def math_sqrt(self, x: int) -> int:
+        if x < 0:
+            self.sys_error(4)
+        return math.isqrt(x)
+
+    def memory_alloc(self, size: int) -> int:
+        """Allocates from the heap without ever reusing memory, which is
+        enough for the short runs this is meant for.
+        """
+        if size <= 0:
+            self.sys_error(5)
+        address = self.heap_top
+        if address + size > HEAP_END:
+            self.sys_error(6)
+        self.heap_top += size
+        return address
+
+    def memory_peek(self, address: int) -> int:
+        return self.ram[address]
+
+    def memory_poke(self, address: int, value: int) -> int:
+        self.ram[address] = value
+        return 0
+
+    # A string is its capacity, its length, then its characters.
+    def string_new(self, capacity: int) -> int:
+        if capacity < 0:
+            self.sys_error(14)
+        string = self.memory_alloc(capacity + 2)
+        self.ram[string] = capacity
+        self.ram[string + 1] = 0
+        return string
+
+    def string_length(self, string: int) -> int:
+        return self.ram[string + 1]
+
+    def string_char_at(self, string: int, index: int) -> int:
+        if not 0 <= index < self.ram[string + 1]:
+            self.sys_error(15)
+        return self.ram[string + 2 + index]
+
+    def string_set_char_at(self, string: int, index: int, char: int) -> int:
+        if not 0 <= index < self.ram[string + 1]:
+            self.sys_error(16)
+        self.ram[string + 2 + index] = char
+        return 0
+
+    def string_append_char(self, string: int, char: int) -> int:
+        length = self.ram[string + 1]
+        if length >= self.ram[string]:
+            self.sys_error(17)
+        self.ram[string + 2 + length] = char
+        self.ram[string + 1] = length + 1
+        return string
+
+    def string_erase_last_char(self, string: int) -> int:
+        if self.ram[string + 1] == 0:
+            self.sys_error(18)
+        self.ram[string + 1] -= 1
+        return 0
+
+    def string_text(self, string: int) -> str:
+        return "".join(map(chr, self.ram[string + 2:string + 2 + self.ram[string + 1]]))
+
+    def string_int_value(self, string: int) -> int:
+        """Reads the number at the start of the string, like the Jack OS."""
+        text = self.string_text(string)
+        sign = -1 if text[:1] == "-" else 1
+        if sign < 0:
+            text = text[1:]
+        end = 0
+        while end < len(text) and "0" <= text[end] <= "9":
+            end += 1
+        return sign * int(text[:end]) if end else 0
+
+    def string_set_int(self, string: int, number: int) -> int:
+        text = str(number)
+        if len(text) > self.ram[string]:
+            self.sys_error(19)
+        self.ram[string + 1] = len(text)
+        self.ram[string + 2:string + 2 + len(text)] = array.array('h', map(ord, text))
+        return 0
+
+    def output_print_char(self, char: int) -> int:
+        self.output_stream.write("\n" if char == NEW_LINE else "\b" if char == BACKSPACE
+                                 else chr(char))
+        return 0
+
+    def output_print_string(self, string: int) -> int:
+        self.output_stream.write(self.string_text(string))
+        return 0
+
+    def output_print_int(self, number: int) -> int:
+        self.output_stream.write(str(number))
+        return 0
+
+    def keyboard_read_line(self, prompt: int) -> int:
+        self.output_print_string(prompt)
+        line = self.input_stream.readline() if self.input_stream else ""
+        line = line.rstrip("\n")
+        string = self.string_new(max(len(line), 1))
+        for char in line:
+            self.string_append_char(string, ord(char))
+        return string
+
+    def keyboard_read_int(self, prompt: int) -> int:
+        return self.string_int_value(self.keyboard_read_line(prompt))
+
+    def keyboard_read_char(self) -> int:
+        char = self.input_stream.read(1) if self.input_stream else ""
+        return NEW_LINE if char in ("", "\n") else ord(char)
+
+    def sys_halt(self) -> int:
+        self.halted = True
+        return 0
+
+    def sys_error(self, code: int) -> None:
+        raise RuntimeError(f"Sys.error {code}")
+
+
+if "__main__" == __name__:
+    parser = argparse.ArgumentParser(
+        prog="VMInterpreter",
+        description="Runs compiled VM code, printing what it outputs.")
+    parser.add_argument("input_path",
+                        help="a .vm or .vmb file, or a directory of them")
+    parser.add_argument("--max-instructions", type=int, default=0, metavar="N",
+                        help="stop after executing N commands")
+    parser.add_argument("--stats", action="store_true",
+                        help="print the instructions and estimated cycles "
+                             "executed, and the time taken, to standard error")
+    args = parser.parse_args()
+    interpreter = VMInterpreter(read_program(args.input_path), sys.stdout, sys.stdin)
+    start = time.perf_counter()
+    try:
+        interpreter.run(args.max_instructions)
+    finally:
+        elapsed = time.perf_counter() - start
+        sys.stdout.flush()
+        if args.stats:
+            print(f"{interpreter.instructions} instructions, {interpreter.cycles} "
+                  f"cycles in {elapsed:.3f}s "
+                  f"({interpreter.instructions / max(elapsed, 1e-9):,.0f} "
+                  f"instructions/s)", file=sys.stderr)
@@ -0,0 +1,241 @@
+"""
+This file is part of nand2tetris, as taught in The Hebrew University, and
+was written by Aviv Yaish. It is an extension to the specifications given
+[here](https://www.nand2tetris.org) (Shimon Schocken and Noam Nisan, 2017),
+as allowed by the Creative Common Attribution-NonCommercial-ShareAlike 3.0
+Unported [License](https://creativecommons.org/licenses/by-nc-sa/3.0/).
+"""
+import typing
+
+# The functions a Hack program may start at: Sys.init boots the OS and then
+# calls Main.main, and programs run without the OS start at Main.main.
+ENTRY_POINTS = ("Sys.init", "Main.main")
+# The default largest function, in commands after its "function" command,
+# that is inlined.
+INLINE_SIZE = 8
+# How every method starts, see CompilationEngine.compile_body.
+METHOD_PROLOGUE = ["push argument 0", "pop pointer 0"]
+ARITHMETIC = frozenset(["add", "sub", "neg", "eq", "gt", "lt", "and", "or",
+                        "not", "shiftleft", "shiftright"])
+# Inlined arguments are kept in temp 1 to temp 7. temp 0 is only used by a
+# "do" statement, and temp 1 by code that makes no calls, so neither is live
+# across a call site.
+MAX_INLINE_ARGUMENTS = 7
+
+
+class VMProgram:
+    """The compiled VM code of every class of a program, split into
+    functions, for optimizations that need to see the whole program at once.
+    A function is kept as the list of its command lines, starting with its
+    "function" command.
+    """
+
+    def __init__(self) -> None:
+        self.classes = dict()
+        self.functions = dict()
+
+    def add_class(self, class_name: str, code: str) -> None:
+        """Adds the compiled code of a class.
+
+        Args:
+            class_name (str): the name of the class.
+            code (str): the contents of its .vm file.
+        """
+        names = []
+        lines = None
+        for line in code.splitlines():
+            if not line:
+                continue
+            if line.startswith("function "):
+                lines = []
+                name = line.split()[1]
+                names.append(name)
+                self.functions[name] = lines
+            lines.append(line)
+        self.classes[class_name] = names
+
+    def class_code(self, class_name: str) -> str:
+        """
+        Args:
+            class_name (str): the name of a class that was added.
+
+        Returns:
+            str: the VM code of the functions left in the class.
+        """
+        return "".join(f"{line}\n" for name in self.classes[class_name]
+                       for line in self.functions[name])
+
+    def command_count(self) -> int:
+        return sum(len(lines) for lines in self.functions.values())
+
+    def callees(self, name: str) -> typing.Set[str]:
+        """
+        Args:
+            name (str): the name of a function of the program.
+
+        Returns:
+            typing.Set[str]: the functions it calls, including OS functions
+            that are not part of the program.
+        """
+        return {line.split()[1] for line in self.functions[name]
+                if line.startswith("call ")}
+
+    def reachable(self, roots: typing.Iterable[str] = ENTRY_POINTS) -> typing.Set[str]:
+        """
+        Args:
+            roots (typing.Iterable[str]): the functions execution starts at.
+
+        Returns:
+            typing.Set[str]: the functions of the program that a chain of
+            calls from any of the roots leads to, roots included.
+        """
+        reached = set()
+        pending = [name for name in roots if name in self.functions]
+        while pending:
+            name = pending.pop()
+            if name in reached:
+                continue
+            reached.add(name)
+            pending.extend(callee for callee in self.callees(name)
+                           if callee in self.functions and callee not in reached)
+        return reached
+
+    def inline_body(self, name: str) -> typing.Optional[typing.Tuple[int, typing.List[str]]]:
+        """Translates a function to code that can replace a call to it.
+
+        Only functions without locals whose body is a single straight line of
+        constant, argument and (in methods) field accesses and arithmetic,
+        ending with a return, are inlined, e.g. getters and setters. Argument
+        i is read from temp i + 1, except the object of a method, which is
+        put in pointer 1 so that field i becomes "that i". The code this
+        compiler writes never keeps pointer 1 across a call, so overwriting it
+        is safe.
+
+        Args:
+            name (str): the name of a function of the program.
+
+        Returns:
+            typing.Optional[typing.Tuple[int, typing.List[str]]]: the number
+            of arguments the body reads and its translated command lines, or
+            None if the function cannot be inlined.
+        """
+        lines = self.functions[name]
+        if lines[0].split()[2] != "0":
+            return None
+        body = lines[1:]
+        is_method = body[:2] == METHOD_PROLOGUE
+        if is_method:
+            body = body[2:]
+        if not body or body[-1] != "return":
+            return None
+        argument_count = 1 if is_method else 0
+        translated = []
+        for line in body[:-1]:
+            words = line.split()
+            if words[0] == "push" or words[0] == "pop":
+                segment, index = words[1], int(words[2])
+                if segment == "argument" and is_method and index == 0:
+                    line = f"{words[0]} pointer 1"
+                elif segment == "argument" and index < MAX_INLINE_ARGUMENTS:
+                    line = f"{words[0]} temp {index + 1}"
+                    argument_count = max(argument_count, index + 1)
+                elif segment == "this" and is_method:
+                    line = f"{words[0]} that {index}"
+                elif segment != "constant":
+                    return None
+            elif words[0] not in ARITHMETIC:
+                return None
+            translated.append(line)
+        if is_method:
+            translated.insert(0, "pop pointer 1")
+        return argument_count, translated
+
+    def inline(self, max_size: int = INLINE_SIZE) -> int:
+        """Replaces calls to small functions by their bodies, see
+        inline_body. The inlined functions themselves are kept, prune
+        removes them if nothing else calls them.
+
+        Args:
+            max_size (int): the largest function, in commands after its
+            "function" command, to inline.
+
+        Returns:
+            int: the number of calls that were replaced.
+        """
+        bodies = dict()
+        for name, lines in self.functions.items():
+            if len(lines) - 1 <= max_size:
+                body = self.inline_body(name)
+                if body is not None:
+                    bodies[name] = body
+        inlined = 0
+        for lines in self.functions.values():
+            result = []
+            i = 0
+            while i < len(lines):
+                line = lines[i]
+                i += 1
+                words = line.split()
+                if words[0] != "call" or words[1] not in bodies:
+                    result.append(line)
+                    continue
+                argument_count, body = bodies[words[1]]
+                call_arguments = int(words[2])
+                if not argument_count <= call_arguments <= MAX_INLINE_ARGUMENTS:
+                    result.append(line)
+                    continue
+                # Arguments are popped last to first. A method's object is
+                # popped into pointer 1 by its body.
+                first = 1 if body[0] == "pop pointer 1" else 0
+                block = [f"pop temp {index + 1}"
+                         for index in reversed(range(first, call_arguments))] + body
+                block = self.simplify(block)
+                # A "do" statement discards a constant result right away.
+                if block and block[-1].startswith("push constant ") and \
+                        i < len(lines) and lines[i] == "pop temp 0":
+                    block.pop()
+                    i += 1
+                result.extend(block)
+                inlined += 1
+            lines[:] = result
+        return inlined
+
+    @staticmethod
+    def simplify(block: typing.List[str]) -> typing.List[str]:
+        """Removes "pop temp i, push temp i" from an inlined call when
+        nothing else in it uses temp i, i.e. an argument read once, right
+        away.
+        """
+        i = 0
+        while i + 1 < len(block):
+            if block[i].startswith("pop temp ") and \
+                    block[i + 1] == "push" + block[i][3:] and \
+                    sum(line.endswith(block[i][3:]) for line in block) == 2:
+                del block[i:i + 2]
+                i = max(i - 1, 0)
+            else:
+                i += 1
+        return block
+
+    def prune(self, roots: typing.Iterable[str] = ENTRY_POINTS) -> typing.List[str]:
+        """Removes every function that cannot be reached from the roots. If
+        none of the roots is part of the program, there is nothing to start
+        from and nothing is removed.
+
+        Args:
+            roots (typing.Iterable[str]): the functions execution starts at.
+
+        Returns:
+            typing.List[str]: the names of the removed functions, in program
+            order.
+        """
+        reached = self.reachable(roots)
+        if not reached:
+            return []
+        removed = []
+        for class_name, names in self.classes.items():
+            removed.extend(name for name in names if name not in reached)
+            self.classes[class_name] = [name for name in names if name in reached]
+        for name in removed:
+            del self.functions[name]
+        return removed
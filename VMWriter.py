@@ -11,14 +11,47 @@ import typing
 class VMWriter:
     """
     Writes VM commands into a file. Encapsulates the VM command syntax.
+
+    Commands are collected in an in-memory buffer and written to the output
+    stream in one bulk write by flush(), which must be called once the module
+    is complete. The text of every segment and opcode is built once and
+    cached in the class-level tables below.
     """
+    PUSH_PREFIXES = dict()
+    POP_PREFIXES = dict()
+    ARITHMETIC_LINES = {"*": "call Math.multiply 2\n", "/": "call Math.divide 2\n"}
+
+    def __init__(self, output_stream: typing.TextIO, flush_threshold: int = 0) -> None:
+        """Creates a new file and prepares it for writing VM commands.
 
-    def __init__(self, output_stream: typing.TextIO) -> None:
-        """Creates a new file and prepares it for writing VM commands."""
+        Args:
+            output_stream (typing.TextIO): the stream to write to.
+            flush_threshold (int): if positive, the buffer is flushed whenever
+            it holds this many commands, which bounds memory use on huge
+            classes. Otherwise everything is written by the final flush().
+        """
         # Your code goes here!
         # Note that you can write to output_stream like so:
         # output_stream.write("Hello world! \n")
         self.output_stream = output_stream
+        self.flush_threshold = flush_threshold
+        self.buffer = []
+
+    def write_line(self, line: str) -> None:
+        """Buffers a single VM command line.
+
+        Args:
+            line (str): the command, including its trailing newline.
+        """
+        self.buffer.append(line)
+        if self.flush_threshold and len(self.buffer) >= self.flush_threshold:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes all buffered commands to the output stream."""
+        if self.buffer:
+            self.output_stream.write("".join(self.buffer))
+            self.buffer.clear()
 
     def write_push(self, segment: str, index: int) -> None:
         """Writes a VM push command.
@@ -28,7 +61,10 @@ class VMWriter:
             "LOCAL", "STATIC", "THIS", "THAT", "POINTER", "TEMP"
             index (int): the index to push to.
         """
-        self.output_stream.write(f"push {segment.lower()} {index}\n")
+        prefix = VMWriter.PUSH_PREFIXES.get(segment)
+        if prefix is None:
+            prefix = VMWriter.PUSH_PREFIXES[segment] = f"push {segment.lower()} "
+        self.write_line(f"{prefix}{index}\n")
 
     def write_pop(self, segment: str, index: int) -> None:
         """Writes a VM pop command.
@@ -38,7 +74,10 @@ class VMWriter:
             "LOCAL", "STATIC", "THIS", "THAT", "POINTER", "TEMP".
             index (int): the index to pop from.
         """
-        self.output_stream.write(f"pop {segment.lower()} {index}\n")
+        prefix = VMWriter.POP_PREFIXES.get(segment)
+        if prefix is None:
+            prefix = VMWriter.POP_PREFIXES[segment] = f"pop {segment.lower()} "
+        self.write_line(f"{prefix}{index}\n")
 
     def write_arithmetic(self, command: str) -> None:
         """Writes a VM arithmetic command.
@@ -47,11 +86,10 @@ class VMWriter:
             command (str): the command to write, can be "ADD", "SUB", "NEG", 
             "EQ", "GT", "LT", "AND", "OR", "NOT", "SHIFTLEFT", "SHIFTRIGHT".
         """
-        ARI_DICT = {"*": "call Math.multiply 2", "/": "call Math.divide 2"}
-        if command in ARI_DICT.keys():
-            self.output_stream.write(ARI_DICT[command] + "\n")
-        else:
-            self.output_stream.write(command.lower() + "\n")
+        line = VMWriter.ARITHMETIC_LINES.get(command)
+        if line is None:
+            line = VMWriter.ARITHMETIC_LINES[command] = command.lower() + "\n"
+        self.write_line(line)
 
     def write_label(self, label: str) -> None:
         """Writes a VM label command.
@@ -59,7 +97,7 @@ class VMWriter:
         Args:
             label (str): the label to write.
         """
-        self.output_stream.write(f"label {label}\n")
+        self.write_line(f"label {label}\n")
 
     def write_goto(self, label: str) -> None:
         """Writes a VM goto command.
@@ -67,7 +105,7 @@ class VMWriter:
         Args:
             label (str): the label to go to.
         """
-        self.output_stream.write(f"goto {label}\n")
+        self.write_line(f"goto {label}\n")
 
     def write_if(self, label: str) -> None:
         """Writes a VM if-goto command.
@@ -75,7 +113,7 @@ class VMWriter:
         Args:
             label (str): the label to go to.
         """
-        self.output_stream.write(f"if-goto {label}\n")
+        self.write_line(f"if-goto {label}\n")
 
     def write_call(self, name: str, n_args: int) -> None:
         """Writes a VM call command.
@@ -84,7 +122,7 @@ class VMWriter:
             name (str): the name of the function to call.
             n_args (int): the number of arguments the function receives.
         """
-        self.output_stream.write(f"call {name} {n_args}\n")
+        self.write_line(f"call {name} {n_args}\n")
 
     def write_function(self, name: str, n_locals: int) -> None:
         """Writes a VM function command.
@@ -93,8 +131,8 @@ class VMWriter:
             name (str): the name of the function.
             n_locals (int): the number of local variables the function uses.
         """
-        self.output_stream.write(f"function {name} {n_locals}\n")
+        self.write_line(f"function {name} {n_locals}\n")
 
     def write_return(self) -> None:
         """Writes a VM return command."""
-        self.output_stream.write(f"return\n")
+        self.write_line("return\n")